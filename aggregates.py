@@ -0,0 +1,152 @@
+import datetime
+
+from analytics import shift_bucket
+from app_logic import category_totals
+from dates import month_of
+
+
+class ExpenseAggregates:
+    """Running totals over the ledger, updated in O(1) per insert or delete.
+
+    Holds the grand total, per-category sums and optionally per-month
+    ("YYYY-MM") buckets. It follows an ExpenseStore: a reset seeds the sums
+    from the totals the store fetched with its snapshot, inserts and deletes
+    adjust them in place.
+
+    The current month's per-category spending (``period_by_category``), which
+    budgets are checked against, is seeded from the rollup totals the store
+    fetched with its snapshot (or read from the rollups when it has none) and
+    maintained the same way.
+    """
+
+    def __init__(self, store, track_months=False):
+        self.store = store
+        self.track_months = track_months
+        self.count = 0
+        self.total = 0
+        self.by_category = {}
+        self.by_month = {} if track_months else None
+        self._category_count = {}
+        self._month_count = {}
+        self.period = None
+        self.period_by_category = {}
+        self._period_count = {}
+        store.subscribe(self.on_store_changed)
+
+    @staticmethod
+    def month_of(exp):
+        return month_of(exp['date'])
+
+    def reset(self):
+        """Reseed from the store's last load"""
+        totals = self.store.loaded_totals
+        self.by_category = {cat: amount for cat, (amount, _) in totals.items()}
+        self._category_count = {cat: count for cat, (_, count) in totals.items()}
+        self.count = sum(self._category_count.values())
+        self.total = sum(self.by_category.values())
+        if self.track_months:
+            totals = self.store.reader.totals_by_month()
+            self.by_month = {month: amount for month, (amount, _) in totals.items()}
+            self._month_count = {month: count for month, (_, count) in totals.items()}
+        if self.store.loaded_period is not None:
+            self.reset_period(*self.store.loaded_period)
+        else:
+            self.reset_period()
+
+    def reset_period(self, month=None, totals=None):
+        """Reseed the current-period sums for ``month`` (default: this month)
+
+        ``totals`` ({category: (sum, count)}) are read from the rollups when not given.
+        """
+        self.period = month or datetime.date.today().strftime("%Y-%m")
+        if totals is None:
+            totals = self.store.reader.rollup_by_category("month", self.period, shift_bucket("month", self.period, 1))
+        self.period_by_category = {cat: amount for cat, (amount, _) in totals.items()}
+        self._period_count = {cat: count for cat, (_, count) in totals.items()}
+
+    def check_period(self):
+        """Roll over to a new month once the calendar has moved on, returns True if it did
+
+        A store with an executor is not read here: the new month starts
+        empty and the caller reloads the store, whose reset brings in what
+        was already spent.
+        """
+        month = datetime.date.today().strftime("%Y-%m")
+        if month == self.period:
+            return False
+        rolled = self.period is not None
+        self.reset_period(month, {} if self.store.executor is not None else None)
+        return rolled
+
+    def period_total(self):
+        return sum(self.period_by_category.values())
+
+    def on_store_changed(self, event, rows):
+        if event == "reset":
+            self.reset()
+        elif event == "insert":
+            for exp in rows:
+                self.add(exp)
+        elif event == "delete":
+            for exp in rows:
+                self.remove(exp)
+
+    @staticmethod
+    def _bump(sums, counts, key, amount, step):
+        counts[key] = counts.get(key, 0) + step
+        if counts[key] <= 0:
+            # Drop emptied buckets rather than keep zero entries around
+            del counts[key]
+            sums.pop(key, None)
+        else:
+            sums[key] = sums.get(key, 0) + amount
+
+    def add(self, exp):
+        self.count += 1
+        self.total += exp['expense']
+        self._bump(self.by_category, self._category_count, exp['category'], exp['expense'], 1)
+        if self.track_months:
+            self._bump(self.by_month, self._month_count, self.month_of(exp), exp['expense'], 1)
+        if self.month_of(exp) == self.period:
+            self._bump(self.period_by_category, self._period_count, exp['category'], exp['expense'], 1)
+
+    def remove(self, exp):
+        self.count -= 1
+        self.total = self.total - exp['expense'] if self.count else 0
+        self._bump(self.by_category, self._category_count, exp['category'], -exp['expense'], -1)
+        if self.track_months:
+            self._bump(self.by_month, self._month_count, self.month_of(exp), -exp['expense'], -1)
+        if self.month_of(exp) == self.period:
+            self._bump(self.period_by_category, self._period_count, exp['category'], -exp['expense'], -1)
+
+    def top_category(self):
+        """(category, total) with the largest spend, or None"""
+        if not self.by_category:
+            return None
+        name = max(self.by_category, key=self.by_category.get)
+        return name, self.by_category[name]
+
+    def check_consistency(self, expenses=None, tolerance=1e-6):
+        """Compare against a full recompute, raising AssertionError on drift"""
+        if expenses is None:
+            expenses = self.store
+        expected = category_totals(expenses)
+        problems = []
+        if set(expected) != set(self.by_category):
+            problems.append(f"categories {sorted(self.by_category)} != {sorted(expected)}")
+        for cat, amount in expected.items():
+            if abs(self.by_category.get(cat, 0) - amount) > tolerance:
+                problems.append(f"{cat}: {self.by_category.get(cat)} != {amount}")
+        if abs(self.total - sum(expected.values())) > tolerance:
+            problems.append(f"total: {self.total} != {sum(expected.values())}")
+        if self.track_months:
+            months = {}
+            for exp in expenses:
+                month = self.month_of(exp)
+                months[month] = months.get(month, 0) + exp['expense']
+            for month in set(months) | set(self.by_month):
+                if abs(self.by_month.get(month, 0) - months.get(month, 0)) > tolerance:
+                    problems.append(f"{month}: {self.by_month.get(month)} != {months.get(month)}")
+        if problems:
+            raise AssertionError("Aggregates out of sync: " + "; ".join(problems))
+        return True
@@ -0,0 +1,124 @@
+import calendar
+import datetime
+
+PERIODS = ("day", "week", "month")
+
+
+def bucket_of(period, day):
+    """Rollup bucket key of a date for ``period`` (matches database.ROLLUP_BUCKETS)"""
+    if period == "day":
+        return day.strftime("%Y-%m-%d")
+    if period == "week":
+        return (day - datetime.timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+    return day.strftime("%Y-%m")
+
+
+def shift_bucket(period, bucket, steps):
+    """The bucket ``steps`` periods after (or before, when negative) ``bucket``"""
+    if period == "month":
+        year, month = map(int, bucket.split("-"))
+        index = year * 12 + month - 1 + steps
+        return f"{index // 12:04d}-{index % 12 + 1:02d}"
+    day = datetime.datetime.strptime(bucket, "%Y-%m-%d")
+    return (day + datetime.timedelta(days=steps * (7 if period == "week" else 1))).strftime("%Y-%m-%d")
+
+
+def rolling_average(values, window):
+    """Trailing mean over ``window`` points (over fewer at the start)"""
+    averages = []
+    running = 0
+    for i, value in enumerate(values):
+        running += value
+        if i >= window:
+            running -= values[i - window]
+        averages.append(running / min(i + 1, window))
+    return averages
+
+
+class ExpenseAnalytics:
+    """Spending trends answered from the rollup table instead of the expenses.
+
+    DatabaseManager keeps per-day, per-week (Monday based) and per-month
+    totals per category in ``expense_rollups``, maintained by triggers on
+    every insert and delete. Every query here reads a bounded number of
+    buckets, so its cost does not grow with the length of the history.
+    """
+
+    def __init__(self, db, today=None):
+        self.db = db
+        self._today = today
+
+    def today(self):
+        return self._today or datetime.date.today()
+
+    def series(self, period, start, end, category=None):
+        """[(bucket, total)] for every bucket in [start, end), zero where nothing was spent"""
+        totals = {bucket: total for bucket, total, _ in self.db.rollup_totals(period, start, end, category)}
+        series = []
+        bucket = start
+        while bucket < end:
+            series.append((bucket, totals.get(bucket, 0)))
+            bucket = shift_bucket(period, bucket, 1)
+        return series
+
+    def trend(self, period="month", periods=12, window=3, category=None):
+        """The last ``periods`` buckets up to the current one with a rolling average"""
+        end = shift_bucket(period, bucket_of(period, self.today()), 1)
+        series = self.series(period, shift_bucket(period, end, -periods), end, category)
+        totals = [total for _, total in series]
+        return {
+            "period": period,
+            "labels": [bucket for bucket, _ in series],
+            "totals": totals,
+            "average": rolling_average(totals, window)
+        }
+
+    def month_over_month(self, month=None):
+        """{category: {"current", "previous", "delta", "percent"}} for ``month`` vs the month before
+
+        ``percent`` is None when nothing was spent in the previous month.
+        """
+        month = month or bucket_of("month", self.today())
+        previous = shift_bucket("month", month, -1)
+        current_totals = self.db.rollup_by_category("month", month, shift_bucket("month", month, 1))
+        previous_totals = self.db.rollup_by_category("month", previous, month)
+        changes = {}
+        for category in set(current_totals) | set(previous_totals):
+            current = current_totals.get(category, (0, 0))[0]
+            before = previous_totals.get(category, (0, 0))[0]
+            changes[category] = {
+                "current": current,
+                "previous": before,
+                "delta": current - before,
+                "percent": (current - before) * 100 / before if before else None
+            }
+        return changes
+
+    def burn_down(self, budget, month=None):
+        """Budget left after each day of ``month`` (default: this month) up to today
+
+        Returns the days of the month, the remaining budget for the days so
+        far and the ideal straight line from ``budget`` down to zero.
+        """
+        today = self.today()
+        month = month or bucket_of("month", today)
+        year, month_number = map(int, month.split("-"))
+        days_in_month = calendar.monthrange(year, month_number)[1]
+        first = f"{month}-01"
+        end = shift_bucket("month", month, 1) + "-01"
+        spent = [total for _, total in self.series("day", first, end)]
+
+        if (today.year, today.month) == (year, month_number):
+            spent = spent[:today.day]
+        remaining = []
+        left = budget
+        for total in spent:
+            left -= total
+            remaining.append(left)
+        return {
+            "month": month,
+            "budget": budget,
+            "days": list(range(1, days_in_month + 1)),
+            "remaining": remaining,
+            "ideal": [budget * (1 - day / days_in_month) for day in range(1, days_in_month + 1)]
+        }
@@ -1,13 +1,29 @@
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib
+from money import format_money
+from perf import timed
 
-# Set non-interactive backend for thread safety
-matplotlib.use('Agg')
+@timed("category_totals")
+def category_totals(expenses):
+    """Sum expense amounts (integer paise) per category"""
+    if hasattr(expenses, "sum_by_category"):
+        # Columnar ExpenseTable: vectorized group-by
+        return expenses.sum_by_category()
+    category_sum = {}
+    for expense in expenses:
+        cat = expense['category']
+        category_sum[cat] = category_sum.get(cat, 0) + expense['expense']
+    return category_sum
+
+@timed("calculate_financials")
+def calculate_financials(expenses, salary, category_sum=None):
+    """Calculate financial metrics based on expenses and salary (all in paise)
 
-def calculate_financials(expenses, salary):
-    """Calculate financial metrics based on expenses and salary"""
-    total_expense = sum(item['expense'] for item in expenses)
+    Pass precomputed per-category totals (e.g. from SQLite) as ``category_sum``
+    to avoid scanning ``expenses``; for a monthly salary these should be the
+    current month's totals.
+    """
+    if category_sum is None:
+        category_sum = category_totals(expenses)
+    total_expense = sum(category_sum.values())
     remaining = salary - total_expense
     percentage = (total_expense / salary) * 100 if salary > 0 else 0
     
@@ -27,15 +43,9 @@ def calculate_financials(expenses, salary):
         
     # Top Category
     top_cat = "N/A"
-    if expenses:
-        category_sum = {}
-        for expense in expenses:
-            cat = expense['category']
-            category_sum[cat] = category_sum.get(cat, 0) + expense['expense']
-        
-        if category_sum:
-            top_cat_name = max(category_sum, key=category_sum.get)
-            top_cat = f"{top_cat_name} (₹{category_sum[top_cat_name]:.2f})"
+    if category_sum:
+        top_cat_name = max(category_sum, key=category_sum.get)
+        top_cat = f"{top_cat_name} ({format_money(category_sum[top_cat_name])})"
             
     return {
         "total": total_expense,
@@ -46,35 +56,35 @@ def calculate_financials(expenses, salary):
         "top_category": top_cat
     }
 
-def generate_category_chart(expenses, is_dark_mode=False):
+def category_budget_status(category_sum, limits):
+    """Spending against each category limit, most used first
+
+    Returns dicts with category, spent, limit, percent and a status_type of
+    "danger" (over the limit), "warning" (80% or more) or "success".
+    """
+    statuses = []
+    for cat, limit in limits.items():
+        spent = category_sum.get(cat, 0)
+        percent = spent * 100 / limit
+        if percent > 100:
+            status_type = "danger"
+        elif percent >= 80:
+            status_type = "warning"
+        else:
+            status_type = "success"
+        statuses.append({"category": cat, "spent": spent, "limit": limit, "percent": percent, "status_type": status_type})
+    statuses.sort(key=lambda status: status["percent"], reverse=True)
+    return statuses
+
+def generate_category_chart(expenses, is_dark_mode=False, category_sum=None):
     """Generate a pie chart for expenses by category"""
-    if not expenses:
+    if category_sum is None:
+        category_sum = category_totals(expenses)
+    if not category_sum:
         return None
     
-    category_sum = {}
-    for expense in expenses:
-        cat = expense['category']
-        category_sum[cat] = category_sum.get(cat, 0) + expense['expense']
-    
-    labels = list(category_sum.keys())
-    sizes = list(category_sum.values())
-    
-    # Styling
-    plt.style.use('dark_background' if is_dark_mode else 'default')
-    fig, ax = plt.subplots(figsize=(5, 4), dpi=100)
-    fig.patch.set_facecolor('#2d2d2d' if is_dark_mode else '#ffffff')
-    
-    colors = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6', '#1abc9c', '#34495e', '#e67e22']
-    
-    wedges, texts, autotexts = ax.pie(
-        sizes, 
-        labels=labels, 
-        autopct='%1.1f%%', 
-        startangle=140,
-        colors=colors,
-        textprops={'color': 'white' if is_dark_mode else 'black'}
-    )
-    
-    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    
-    return fig
+    # Imported here so the summary math does not pull in matplotlib
+    from charts import CategoryPieChart
+    chart = CategoryPieChart()
+    chart.update(category_sum, is_dark_mode)
+    return chart.figure
@@ -0,0 +1,4 @@
+"""Performance benchmarks for Expense Tracker Pro.
+
+Run a benchmark from the project root, e.g. ``python -m benchmarks.history_refresh``.
+"""
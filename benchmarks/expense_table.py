@@ -0,0 +1,69 @@
+"""Compare the list-of-dicts ledger with the columnar ExpenseTable.
+
+Usage: python -m benchmarks.expense_table [rows]
+
+Builds a throwaway SQLite ledger (1,000,000 rows by default) and reports
+load time, memory held and per-category aggregation time for both shapes.
+Runs headless.
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app_logic import category_totals
+from benchmarks.ledger import populate
+from database import DatabaseManager
+from expense_table import ExpenseTable, np
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def held_memory(load):
+    """Bytes still allocated by ``load()``'s result"""
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(count=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), os.path.join(tmp, "none.json"))
+        print(f"Populating {count:,} rows...")
+        populate(db, count)
+
+        load_dicts, rows = timed(db.load_expenses, repeat=1)
+        load_table, table = timed(lambda: ExpenseTable.from_db(db), repeat=1)
+        agg_dicts, expected = timed(lambda: category_totals(rows))
+        agg_table, actual = timed(lambda: category_totals(table))
+        assert expected == actual
+        rows = table = None
+
+        mem_dicts = held_memory(db.load_expenses)
+        mem_table = held_memory(lambda: ExpenseTable.from_db(db))
+        db.close()
+
+    print(f"NumPy: {'yes' if np is not None else 'no (pure Python fallback)'}")
+    print(f"{'':<22}{'dict list':>14}{'ExpenseTable':>14}")
+    print(f"{'load from SQLite':<22}{load_dicts:>13.2f}s{load_table:>13.2f}s")
+    print(f"{'memory held':<22}{mem_dicts / 2**20:>12.1f}MB{mem_table / 2**20:>12.1f}MB")
+    print(f"{'bytes per row':<22}{mem_dicts / count:>14.0f}{mem_table / count:>14.0f}")
+    print(f"{'sum by category':<22}{agg_dicts * 1000:>12.1f}ms{agg_table * 1000:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,82 @@
+"""Compare refreshing the History table with the legacy loop vs VirtualTreeview.
+
+Usage: python -m benchmarks.history_refresh [rows]
+Needs a display (or Xvfb) because it drives real Tk widgets.
+"""
+import random
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from dates import format_date, to_epoch
+from money import format_money
+from styles import CATEGORIES
+from virtual_tree import VirtualTreeview
+
+COLUMNS = ("Amount", "Category", "Comment", "Date")
+
+
+def make_rows(count):
+    rng = random.Random(42)
+    return [{
+        "id": i,
+        "expense": rng.randint(1_000, 500_000),
+        "category": rng.choice(CATEGORIES),
+        "comment": f"note {i}",
+        "date": to_epoch(f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00")
+    } for i in range(count, 0, -1)]
+
+
+def row_values(exp):
+    return (format_money(exp['expense']), exp['category'], exp['comment'], format_date(exp['date']))
+
+
+def legacy_refresh(tree, rows):
+    """The pre-virtualization refresh: clear everything, insert every row"""
+    for item in tree.get_children():
+        tree.delete(item)
+    for exp in rows:
+        tree.insert("", "end", values=row_values(exp) + (exp['id'],))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+
+    root = tk.Tk()
+    root.geometry("800x600")
+
+    frame = ttk.Frame(root)
+    frame.pack(fill="both", expand=True)
+    tree = ttk.Treeview(frame, columns=COLUMNS, show="headings")
+    tree.pack(fill="both", expand=True)
+    root.update()
+    first = timed(legacy_refresh, tree, rows)
+    again = timed(legacy_refresh, tree, rows)
+    frame.destroy()
+
+    frame = ttk.Frame(root)
+    frame.pack(fill="both", expand=True)
+    history = VirtualTreeview(frame, COLUMNS, row_values, lambda exp: exp['id'], show="headings")
+    history.pack()
+    root.update()
+    v_first = timed(history.set_source, rows)
+    v_again = timed(history.refresh)
+    v_scroll = timed(history.scroll_to, count // 2)
+
+    print(f"rows: {count}  visible: {history.visible_rows}")
+    print(f"legacy  first refresh: {first * 1000:9.1f} ms   repeat: {again * 1000:9.1f} ms")
+    print(f"virtual first refresh: {v_first * 1000:9.1f} ms   repeat: {v_again * 1000:9.1f} ms"
+          f"   scroll: {v_scroll * 1000:.1f} ms")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Reproducible synthetic ledgers for benchmarks and manual testing.
+
+Usage: python -m benchmarks.ledger rows out.db [--seed 42] [--years 5]
+
+Expenses are spread evenly over ``years`` ending on END_DATE and come out
+in date order, like a ledger that grew one entry at a time. Categories
+follow CATEGORY_PROFILES (weights and log-normal amounts around a typical
+spend), times cluster around meals and evenings, and most amounts are
+whole rupees. The same seed always gives the same rows.
+"""
+import argparse
+import math
+import random
+import time
+from itertools import islice
+
+from database import DatabaseManager
+from dates import SECONDS_PER_DAY, to_epoch
+from styles import CATEGORIES
+
+END_DATE = "2025-01-01"
+
+# category: (share of expenses, median amount in rupees, log-normal sigma, comments)
+CATEGORY_PROFILES = {
+    "Food": (0.34, 220, 0.8, ["groceries", "lunch", "dinner", "swiggy", "zomato", "chai", "bakery", "supermarket"]),
+    "Transport": (0.20, 120, 0.7, ["uber home", "ola to office", "metro card", "petrol", "auto", "parking"]),
+    "Entertainment": (0.08, 450, 0.7, ["netflix", "movie", "spotify", "concert", "games"]),
+    "Shopping": (0.12, 1100, 1.0, ["amazon", "flipkart", "clothes", "shoes", "myntra", "gift"]),
+    "Health": (0.06, 700, 0.9, ["pharmacy", "doctor", "gym", "lab test", "insurance"]),
+    "Education": (0.04, 1800, 1.0, ["books", "course", "udemy", "tuition", "stationery"]),
+    "Utilities": (0.09, 1400, 0.6, ["electricity bill", "water bill", "broadband", "mobile recharge", "gas cylinder"]),
+    "Other": (0.07, 500, 1.1, ["misc", "donation", "repairs", "laundry"])
+}
+DEFAULT_PROFILE = (0.05, 500, 1.0, ["misc"])
+
+# Relative likelihood of an expense in each hour of the day
+HOUR_WEIGHTS = [1, 1, 0, 0, 0, 1, 2, 4, 6, 7, 6, 6, 9, 9, 6, 5, 5, 6, 8, 10, 10, 8, 5, 2]
+
+
+def generate_rows(count, seed=42, years=5, end=END_DATE):
+    """Yield ``count`` (expense paise, category, comment, date) tuples in date order"""
+    rng = random.Random(seed)
+    profiles = [CATEGORY_PROFILES.get(category, DEFAULT_PROFILE) for category in CATEGORIES]
+    weights = [profile[0] for profile in profiles]
+    last_day = to_epoch(end) // SECONDS_PER_DAY
+    days = round(years * 365.25)
+    first_day = last_day - days
+    hours = range(24)
+    for i in range(count):
+        index = rng.choices(range(len(CATEGORIES)), weights)[0]
+        _, median, sigma, comments = profiles[index]
+        rupees = rng.lognormvariate(math.log(median), sigma)
+        # Most expenses are whole rupees, some carry paise
+        expense = max(100, round(rupees) * 100 if rng.random() < 0.7 else round(rupees * 100))
+        comment = "N/A" if rng.random() < 0.25 else rng.choice(comments)
+        day = first_day + i * days // count
+        minute = rng.choices(hours, HOUR_WEIGHTS)[0] * 60 + rng.randrange(60)
+        yield (expense, CATEGORIES[index], comment, day * SECONDS_PER_DAY + minute * 60)
+
+
+def populate(db, count, seed=42, years=5, batch=50_000):
+    """Insert a synthetic ledger of ``count`` rows into ``db``, returns the seconds taken
+
+    Search and rollup triggers are suspended and their tables rebuilt once
+    at the end, as the importer does for large files.
+    """
+    rows = generate_rows(count, seed, years)
+    start = time.perf_counter()
+    db.suspend_triggers()
+    try:
+        while True:
+            chunk = list(islice(rows, batch))
+            if not chunk:
+                break
+            db.add_expenses(chunk)
+    finally:
+        db.resume_triggers()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic expense ledger")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("db_file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=float, default=5)
+    args = parser.parse_args()
+
+    with DatabaseManager(args.db_file, data_file=args.db_file + ".none.json") as db:
+        seconds = populate(db, args.rows, args.seed, args.years)
+    print(f"Wrote {args.rows:,} expenses to {args.db_file} in {seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
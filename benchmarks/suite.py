@@ -0,0 +1,208 @@
+"""Headless benchmark suite with machine-readable results and baseline comparison.
+
+Usage:
+    python -m benchmarks.suite [--sizes 10000,100000,1000000] [--repeat 3]
+                               [--output results.json] [--baseline baseline.json]
+                               [--save-baseline baseline.json] [--threshold 0.15] [--min-delta 0.005]
+
+For each ledger size a synthetic ledger (benchmarks.ledger, fixed seed) is
+written to a throwaway database and every benchmark in BENCHMARKS is timed
+``repeat`` times; the best and median times are reported. Results are JSON
+with the environment they were measured in. Against ``--baseline`` each
+result is compared by best time and anything slower by more than
+``--threshold`` (and by at least ``--min-delta`` seconds, so timer noise
+on millisecond benchmarks does not count) is flagged as a regression, with
+exit status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from app_logic import calculate_financials, generate_category_chart
+from benchmarks.ledger import generate_rows, populate
+from database import DatabaseManager
+from expense_store import ExpenseStore
+from expense_table import np
+from exporter import export_csv
+from search import SearchIndex
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+SALARY = 50_000_00
+SEARCH_QUERIES = ("uber", "bill", "groceries")
+
+
+class Skip(Exception):
+    """Raised by a benchmark that cannot run in this environment"""
+
+
+def time_best(func, repeat):
+    """(best, median) seconds of ``repeat`` calls of ``func()``"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+# Benchmarks: each takes the fixture dict and returns a zero-argument callable to time
+
+def bench_load_expenses(ctx):
+    return ctx["db"].load_expenses
+
+
+def bench_insert_single(ctx):
+    db = ctx["db"]
+    rows = list(generate_rows(100, seed=1))
+
+    def run():
+        ids = [db.add_expense(*row) for row in rows]
+        db.delete_expenses(ids)
+    return run
+
+
+def bench_insert_delete_bulk(ctx):
+    db = ctx["db"]
+    rows = list(generate_rows(10_000, seed=2))
+    return lambda: db.delete_expenses(db.add_expenses(rows))
+
+
+def bench_calculate_financials(ctx):
+    rows = ctx["rows"]
+    return lambda: calculate_financials(rows, SALARY)
+
+
+def bench_category_chart(ctx):
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    except ImportError:
+        raise Skip("matplotlib not installed")
+    rows = ctx["rows"]
+    return lambda: FigureCanvasAgg(generate_category_chart(rows)).draw()
+
+
+def bench_export_csv(ctx):
+    path = os.path.join(ctx["tmp"], "export.csv")
+    return lambda: export_csv(ctx["db"], path, chunk_size=5000)
+
+
+def bench_search(ctx):
+    store = ExpenseStore(ctx["db"])
+    store.load()
+    index = SearchIndex(store)
+
+    def run():
+        for query in SEARCH_QUERIES:
+            # Start each query afresh rather than narrowing the previous one
+            index.search("")
+            len(index.search(query))
+    return run
+
+
+BENCHMARKS = {
+    "load_expenses": bench_load_expenses,
+    "insert_single_100": bench_insert_single,
+    "insert_delete_bulk_10k": bench_insert_delete_bulk,
+    "calculate_financials": bench_calculate_financials,
+    "category_chart_render": bench_category_chart,
+    "export_csv": bench_export_csv,
+    "search": bench_search
+}
+
+
+def run_size(rows, repeat, names, log):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        with DatabaseManager(os.path.join(tmp, "bench.db"), os.path.join(tmp, "none.json")) as db:
+            seconds = populate(db, rows)
+            results.append({"name": "populate", "rows": rows, "best_s": seconds, "median_s": seconds})
+            log(f"  {'populate':<24}{seconds:>10.3f}s")
+            ctx = {"db": db, "tmp": tmp, "rows": db.load_expenses()}
+            for name in names:
+                try:
+                    func = BENCHMARKS[name](ctx)
+                except Skip as e:
+                    log(f"  {name:<24}   skipped ({str(e)})")
+                    continue
+                best, median = time_best(func, repeat)
+                results.append({"name": name, "rows": rows, "best_s": best, "median_s": median})
+                log(f"  {name:<24}{best:>10.3f}s  (median {median:.3f}s)")
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": np.__version__ if np is not None else None,
+        "platform": platform.platform(),
+        "machine": platform.machine()
+    }
+
+
+def compare(results, baseline, threshold, min_delta=0.0):
+    """Print current vs baseline best times, returns the regressions"""
+    previous = {(item["name"], item["rows"]): item["best_s"] for item in baseline["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<24}{'rows':>10}{'baseline':>11}{'current':>11}{'change':>9}")
+    for item in results:
+        before = previous.get((item["name"], item["rows"]))
+        if before is None:
+            continue
+        change = (item["best_s"] - before) / before if before else 0
+        flag = ""
+        if change > threshold and item["best_s"] - before >= min_delta:
+            flag = "  ⚠️ slower"
+            regressions.append(item)
+        elif change < -threshold and before - item["best_s"] >= min_delta:
+            flag = "  ✅ faster"
+        print(f"{item['name']:<24}{item['rows']:>10,}{before:>10.3f}s{item['best_s']:>10.3f}s{change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headless benchmark suite")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated ledger sizes (default: 10000,100000,1000000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--save-baseline", metavar="FILE", help="also write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown counted as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="smallest slowdown in seconds that counts")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    report = {"created": time.time(), "repeat": args.repeat, "environment": environment(), "results": []}
+    for rows in (int(size) for size in args.sizes.split(",")):
+        print(f"{rows:,} rows")
+        report["results"].extend(run_size(rows, args.repeat, names, print))
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("environment") != report["environment"]:
+            print("⚠️ Baseline was measured in a different environment")
+        if compare(report["results"], baseline, args.threshold, args.min_delta):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
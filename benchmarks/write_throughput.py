@@ -0,0 +1,48 @@
+"""Compare write throughput of the SQLite connection profiles.
+
+Usage: python -m benchmarks.write_throughput [single_inserts] [bulk_rows]
+
+For each profile in database.CONNECTION_PROFILES, opens a throwaway ledger
+and times single-expense inserts (one commit each, as the Add button does)
+and a bulk insert in batches (as the importer does). Runs headless.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.ledger import generate_rows
+from database import CONNECTION_PROFILES, DatabaseManager
+
+
+def make_rows(count, seed=42):
+    return list(generate_rows(count, seed))
+
+
+def measure(profile, singles, bulk, batch=5000):
+    with tempfile.TemporaryDirectory() as tmp:
+        with DatabaseManager(os.path.join(tmp, "bench.db"), os.path.join(tmp, "none.json"), profile=profile) as db:
+            start = time.perf_counter()
+            for row in make_rows(singles):
+                db.add_expense(*row)
+            single_time = time.perf_counter() - start
+
+            rows = make_rows(bulk, seed=7)
+            start = time.perf_counter()
+            for i in range(0, len(rows), batch):
+                db.add_expenses(rows[i:i + batch])
+            bulk_time = time.perf_counter() - start
+            journal = db.conn.execute('PRAGMA journal_mode').fetchone()[0]
+    return journal, singles / single_time, bulk / bulk_time
+
+
+def main(singles=2000, bulk=200_000):
+    print(f"{singles:,} single inserts, {bulk:,} rows in bulk batches")
+    print(f"{'profile':<10}{'journal':>9}{'single rows/s':>16}{'bulk rows/s':>14}")
+    for profile in CONNECTION_PROFILES:
+        journal, single_rate, bulk_rate = measure(profile, singles, bulk)
+        print(f"{profile:<10}{journal:>9}{single_rate:>16,.0f}{bulk_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,146 @@
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+CHART_KINDS = ("category", "trend", "burn_down")
+
+
+class ChartImage:
+    """A rendered chart: ``width`` x ``height`` pixels of RGBA bytes"""
+
+    __slots__ = ("width", "height", "rgba", "_png")
+
+    def __init__(self, width, height, rgba):
+        self.width = width
+        self.height = height
+        self.rgba = rgba
+        self._png = None
+
+    def to_pil(self):
+        from PIL import Image
+        return Image.frombuffer("RGBA", (self.width, self.height), self.rgba, "raw", "RGBA", 0, 1)
+
+    def png(self):
+        """PNG encoding of the image, computed once"""
+        if self._png is None:
+            buffer = io.BytesIO()
+            self.to_pil().save(buffer, format="PNG")
+            self._png = buffer.getvalue()
+        return self._png
+
+    def save(self, file_path):
+        with open(file_path, "wb") as file:
+            file.write(self.png())
+
+
+class RenderCache:
+    """Least-recently-used ChartImages by render key (shared by the Tk and render threads)"""
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.capacity:
+                self._images.popitem(last=False)
+
+    def __len__(self):
+        return len(self._images)
+
+
+def data_key(kind, data):
+    """Hashable summary of everything a chart of ``kind`` draws from ``data``"""
+    if kind == "category":
+        return tuple(sorted(data.items()))
+    if kind == "trend":
+        return (data["period"], tuple(data["labels"]), tuple(data["totals"]), tuple(data["average"]))
+    return (data["month"], data["budget"], tuple(data["remaining"]))
+
+
+def chart_class(kind):
+    import charts
+    return {
+        "category": charts.CategoryPieChart,
+        "trend": charts.TrendChart,
+        "burn_down": charts.BurnDownChart
+    }[kind]
+
+
+class ChartRenderer:
+    """Draws charts to RGBA images on a worker thread.
+
+    matplotlib (Agg, through charts.py) only ever runs on the single render
+    thread, which keeps one chart object per kind so repeated renders update
+    the figure in place. Finished images are cached by (kind, data, theme,
+    size) with LRU eviction: showing a chart again, switching back to a
+    theme or saving the chart that is on screen costs no drawing.
+    """
+
+    def __init__(self, cache_size=16, dpi=100):
+        self.dpi = dpi
+        self.cache = RenderCache(cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+        self._charts = {}
+        self._pending = set()
+
+    def key(self, kind, data, is_dark_mode, size):
+        return (kind, data_key(kind, data), is_dark_mode, tuple(size))
+
+    def render(self, kind, data, is_dark_mode=False, size=(500, 400)):
+        """Future of the ChartImage for ``data`` at ``size`` (width, height) pixels
+
+        ``data`` must not change while the render runs; pass a copy of live state.
+        Cached images come back as an already completed Future.
+        """
+        key = self.key(kind, data, is_dark_mode, size)
+        image = self.cache.get(key)
+        if image is not None:
+            future = Future()
+            future.set_result(image)
+            return future
+        future = self._pool.submit(self._render, key, kind, data, is_dark_mode, size)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def render_now(self, kind, data, is_dark_mode=False, size=(500, 400)):
+        """Blocking render, for headless reports"""
+        return self.render(kind, data, is_dark_mode, size).result()
+
+    def _render(self, key, kind, data, is_dark_mode, size):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        chart = self._charts.get(kind)
+        if chart is None:
+            chart = self._charts[kind] = chart_class(kind)(dpi=self.dpi)
+            FigureCanvasAgg(chart.figure)
+        width, height = size
+        inches = (width / self.dpi, height / self.dpi)
+        if tuple(chart.figure.get_size_inches()) != inches:
+            chart.figure.set_size_inches(*inches)
+            # Rebuild so the layout is worked out for the new size
+            chart.key = None
+        chart.update(data, is_dark_mode)
+        canvas = chart.figure.canvas
+        canvas.draw()
+        image = ChartImage(*canvas.get_width_height(), bytes(canvas.buffer_rgba()))
+        self.cache.put(key, image)
+        return image
+
+    def shutdown(self, wait=False):
+        # Drop queued renders by hand (shutdown's cancel_futures needs Python 3.9)
+        for future in list(self._pending):
+            future.cancel()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,164 @@
+import math
+
+from matplotlib.figure import Figure
+
+from money import to_rupees
+
+CHART_COLORS = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6', '#1abc9c', '#34495e', '#e67e22']
+
+
+def chart_theme(is_dark_mode):
+    """(face color, text color) for a chart in the given mode"""
+    return ('#2d2d2d', 'white') if is_dark_mode else ('#ffffff', 'black')
+
+
+class CategoryPieChart:
+    """Category pie drawn on one persistent Figure and updated in place.
+
+    The Figure is built with the object-oriented API so no global pyplot
+    style or figure manager is involved. ``update`` compares a key made of
+    the per-category sums and the theme with the last one it drew and
+    reports whether anything changed, so callers only redraw when needed.
+    """
+
+    START_ANGLE = 140
+    LABEL_DISTANCE = 1.1
+    PCT_DISTANCE = 0.6
+
+    def __init__(self, figsize=(5, 4), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax = self.figure.add_subplot(111)
+        self.labels = None
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+        self.key = None
+
+    @staticmethod
+    def cache_key(category_sum, is_dark_mode):
+        return hash((tuple(sorted(category_sum.items())), is_dark_mode))
+
+    def update(self, category_sum, is_dark_mode=False):
+        """Bring the figure up to date, returns True if it needs redrawing"""
+        key = self.cache_key(category_sum, is_dark_mode)
+        if key == self.key:
+            return False
+
+        labels = list(category_sum.keys())
+        sizes = list(category_sum.values())
+        if labels == self.labels:
+            self._move_wedges(sizes)
+        else:
+            self._build(labels, sizes)
+        self._apply_theme(is_dark_mode)
+        self.key = key
+        return True
+
+    def _build(self, labels, sizes):
+        self.ax.clear()
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            sizes,
+            labels=labels,
+            autopct='%1.1f%%',
+            startangle=self.START_ANGLE,
+            colors=CHART_COLORS,
+            labeldistance=self.LABEL_DISTANCE,
+            pctdistance=self.PCT_DISTANCE
+        )
+        self.ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+        self.labels = labels
+
+    def _move_wedges(self, sizes):
+        """Same categories, new amounts: re-angle the existing artists"""
+        total = float(sum(sizes))
+        theta1 = self.START_ANGLE
+        for wedge, text, autotext, size in zip(self.wedges, self.texts, self.autotexts, sizes):
+            frac = size / total if total else 0
+            theta2 = theta1 + 360 * frac
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            mid = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            text.set_position((self.LABEL_DISTANCE * x, self.LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((self.PCT_DISTANCE * x, self.PCT_DISTANCE * y))
+            autotext.set_text(f"{100 * frac:.1f}%")
+            theta1 = theta2
+
+    def _apply_theme(self, is_dark_mode):
+        face, text_color = chart_theme(is_dark_mode)
+        self.figure.patch.set_facecolor(face)
+        self.ax.set_facecolor(face)
+        for text in self.texts + self.autotexts:
+            text.set_color(text_color)
+
+
+class TrendChart:
+    """Spending per period as bars with a rolling-average line"""
+
+    def __init__(self, figsize=(5, 4), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax = self.figure.add_subplot(111)
+        self.key = None
+
+    def update(self, trend, is_dark_mode=False):
+        """Redraw from ``ExpenseAnalytics.trend()`` output, returns True if anything changed"""
+        key = hash((tuple(trend["labels"]), tuple(trend["totals"]), is_dark_mode))
+        if key == self.key:
+            return False
+        face, text_color = chart_theme(is_dark_mode)
+        positions = range(len(trend["labels"]))
+        self.ax.clear()
+        self.ax.bar(positions, [to_rupees(t) for t in trend["totals"]], color=CHART_COLORS[0], label=f"Per {trend['period']}")
+        self.ax.plot(positions, [to_rupees(a) for a in trend["average"]], color=CHART_COLORS[3], linewidth=2, label="Rolling average")
+        # Thin the tick labels out so they stay readable for long series
+        step = max(1, len(trend["labels"]) // 6)
+        self.ax.set_xticks(list(positions)[::step])
+        self.ax.set_xticklabels(trend["labels"][::step], rotation=30, ha='right')
+        self.ax.set_ylabel("₹")
+        _style_axes(self.figure, self.ax, face, text_color)
+        self.key = key
+        return True
+
+
+class BurnDownChart:
+    """Budget remaining through the month against the ideal straight line"""
+
+    def __init__(self, figsize=(5, 4), dpi=100):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax = self.figure.add_subplot(111)
+        self.key = None
+
+    def update(self, burn, is_dark_mode=False):
+        """Redraw from ``ExpenseAnalytics.burn_down()`` output, returns True if anything changed"""
+        key = hash((burn["month"], burn["budget"], tuple(burn["remaining"]), is_dark_mode))
+        if key == self.key:
+            return False
+        face, text_color = chart_theme(is_dark_mode)
+        days = burn["days"]
+        self.ax.clear()
+        self.ax.plot(days, [to_rupees(i) for i in burn["ideal"]], color=CHART_COLORS[6], linestyle='--', label="Ideal")
+        self.ax.plot(days[:len(burn["remaining"])], [to_rupees(r) for r in burn["remaining"]], color=CHART_COLORS[0],
+                     linewidth=2, label="Remaining")
+        self.ax.axhline(0, color=CHART_COLORS[2], linewidth=1)
+        self.ax.set_xlim(days[0], days[-1])
+        self.ax.set_xlabel(f"Day of {burn['month']}")
+        self.ax.set_ylabel("₹")
+        _style_axes(self.figure, self.ax, face, text_color)
+        self.key = key
+        return True
+
+
+def _style_axes(figure, ax, face, text_color):
+    figure.patch.set_facecolor(face)
+    ax.set_facecolor(face)
+    ax.tick_params(colors=text_color)
+    ax.xaxis.label.set_color(text_color)
+    ax.yaxis.label.set_color(text_color)
+    for spine in ax.spines.values():
+        spine.set_color(text_color)
+    legend = ax.legend(loc='best', frameon=False)
+    for text in legend.get_texts():
+        text.set_color(text_color)
+    figure.tight_layout()
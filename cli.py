@@ -0,0 +1,331 @@
+"""Headless command-line interface to the expense ledger.
+
+Usage:
+    python cli.py add 250 Food --comment "lunch" [--date "2024-03-05 12:30"]
+    python cli.py import statement.csv [--map expense=Debit --map comment=Narration]
+    python cli.py list [--from 2024-03-01] [--to 2024-03-31] [--category Food] [--search uber] [--format csv|table]
+    python cli.py summary [--month 2024-03]
+    python cli.py export march.csv [--from ...] [--to ...] [--category ...] [--search ...]
+    python cli.py chart trend.png [--kind category|trend|burn-down] [--month 2024-03] [--size 800x600] [--dark]
+    python cli.py archive [--hot-years 2]
+    python cli.py totals [--by category|month] [--from ...] [--to ...] [--category ...] [--ledgers DIR]
+
+Built on DatabaseManager and app_logic only: nothing on this path imports
+Tk, and modules a command does not need are imported inside that command
+(matplotlib only for ``chart``). ``list`` and ``export`` stream rows from a SQLite cursor a
+chunk at a time, so output size does not affect memory use. Progress and
+messages go to stderr, data to stdout. Once closed years have been moved
+into archive shards (``archive``, see ledgers.py), ``list``, ``export``,
+``totals``, ``summary`` and ``chart`` read across the hot shard and the
+archives their dates touch (budgets stay in the main database).
+"""
+import argparse
+import datetime
+import os
+import sys
+
+from database import DatabaseManager, TOTAL_BUDGET
+from dates import format_date, to_epoch
+from money import format_amount, format_money, to_paise
+from perf import perf
+from styles import CATEGORIES
+
+
+def parse_category(value):
+    for category in CATEGORIES:
+        if value.lower() == category.lower():
+            return category
+    raise argparse.ArgumentTypeError(f"unknown category '{value}' (choose from {', '.join(CATEGORIES)})")
+
+
+def parse_day(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def query_filters(args):
+    """DatabaseManager filter kwargs from the shared --from/--to/--category/--search options"""
+    filters = {"category": args.category}
+    if getattr(args, "search", None):
+        filters["text"] = args.search
+    if args.start:
+        filters["start"] = to_epoch(args.start)
+    if args.end:
+        # --to is inclusive, the query bound is exclusive
+        filters["end"] = to_epoch(args.end + datetime.timedelta(days=1))
+    return filters
+
+
+def expense_source(db):
+    """The sharded ledger once closed years have been archived, otherwise ``db`` itself"""
+    from ledgers import ShardedLedger
+
+    ledger = ShardedLedger(db.db_file)
+    return ledger if ledger.archived_years() else db
+
+
+def progress_line(message):
+    sys.stderr.write(f"\r{message}")
+    sys.stderr.flush()
+
+
+# Commands
+
+def cmd_add(db, args):
+    try:
+        amount = to_paise(args.amount)
+        date = to_epoch(args.date) if args.date else to_epoch(datetime.datetime.now().replace(second=0, microsecond=0))
+    except ValueError as e:
+        raise SystemExit(f"❌ {str(e)}")
+    if amount <= 0:
+        raise SystemExit("❌ Amount must be greater than 0")
+    expense_id = db.add_expense(amount, args.category, args.comment or "N/A", date)
+    print(f"✅ Added expense {expense_id}: {format_money(amount)} {args.category} on {format_date(date)}", file=sys.stderr)
+
+
+def cmd_import(db, args):
+    from importer import import_expenses
+
+    columns = None
+    if args.map:
+        columns = dict(item.split("=", 1) for item in args.map)
+    result = import_expenses(db, args.file, lambda done: progress_line(f"⏳ {done:,} records read"), columns=columns)
+    sys.stderr.write("\n")
+    print(f"✅ Imported {result['imported']:,} of {result['read']:,} records "
+          f"({result['duplicates']:,} duplicates, {result['skipped']:,} non-debit, "
+          f"{result['invalid']:,} invalid)", file=sys.stderr)
+    for error in result["errors"]:
+        print(f"⚠️ {error}", file=sys.stderr)
+    # Credits and blank debit cells are expected on a statement; malformed rows are not
+    return 1 if result["invalid"] else 0
+
+
+def cmd_list(db, args):
+    filters = query_filters(args)
+    source = expense_source(db)
+    out = sys.stdout
+    if args.format == "csv":
+        import csv
+        from exporter import CSV_HEADER
+
+        writer = csv.writer(out)
+        writer.writerow(CSV_HEADER)
+        for rows in source.iter_expense_chunks(args.chunk_size, **filters):
+            writer.writerows(
+                (format_amount(expense), category, comment, format_date(date))
+                for _, expense, category, comment, date in rows
+            )
+        return 0
+    for rows in source.iter_expense_chunks(args.chunk_size, **filters):
+        out.write("".join(
+            f"{expense_id:>8}  {format_date(date)}  {format_amount(expense):>12}  {category:<14}{comment}\n"
+            for expense_id, expense, category, comment, date in rows
+        ))
+    return 0
+
+
+def cmd_summary(db, args):
+    from analytics import shift_bucket
+    from app_logic import calculate_financials, category_budget_status
+
+    month = args.month or datetime.date.today().strftime("%Y-%m")
+    totals = expense_source(db).rollup_by_category("month", month, shift_bucket("month", month, 1))
+    category_sum = {cat: amount for cat, (amount, _) in totals.items()}
+    budgets = db.budgets_for(month)
+    salary = budgets.pop(TOTAL_BUDGET, 0)
+    financials = calculate_financials(None, salary, category_sum)
+
+    print(f"📅 Month:          {month}")
+    print(f"🧾 Expenses:       {sum(count for _, count in totals.values()):,}")
+    print(f"💷 Spent:          {format_money(financials['total'])}")
+    if salary:
+        print(f"💰 Budget:         {format_money(salary)}")
+        print(f"📊 Remaining:      {format_money(financials['remaining'])} ({financials['percentage']:.1f}% used)")
+    print(f"🏷️ Top category:   {financials['top_category']}")
+    print(f"🚦 Status:         {financials['status']}")
+    if category_sum:
+        print()
+        for cat in sorted(category_sum, key=category_sum.get, reverse=True):
+            print(f"  {cat:<16}{format_money(category_sum[cat]):>14}")
+    if budgets:
+        print()
+        for status in category_budget_status(category_sum, budgets):
+            print(f"  🎯 {status['category']:<13}{format_money(status['spent']):>14} of "
+                  f"{format_money(status['limit'])} ({status['percent']:.0f}%)")
+    return 0
+
+
+def cmd_export(db, args):
+    from exporter import export_csv
+
+    count = export_csv(
+        expense_source(db), args.file,
+        lambda done, total: progress_line(f"⏳ Exporting... {done:,}/{total:,}"),
+        chunk_size=args.chunk_size, **query_filters(args)
+    )
+    sys.stderr.write("\n")
+    print(f"✅ Exported {count:,} records to {os.path.basename(args.file)}", file=sys.stderr)
+    return 0
+
+
+def cmd_chart(db, args):
+    from analytics import ExpenseAnalytics
+    from chart_renderer import ChartRenderer
+
+    source = expense_source(db)
+    analytics = ExpenseAnalytics(source)
+    if args.kind == "trend":
+        kind, data = "trend", analytics.trend("month", periods=args.months, window=3)
+    elif args.kind == "burn-down":
+        month = args.month or datetime.date.today().strftime("%Y-%m")
+        budget = db.budgets_for(month).get(TOTAL_BUDGET, 0)
+        if not budget:
+            raise SystemExit(f"❌ No monthly budget set for {month}")
+        kind, data = "burn_down", analytics.burn_down(budget, month)
+    else:
+        kind, data = "category", {cat: amount for cat, (amount, _) in source.totals_by_category().items()}
+        if not data:
+            raise SystemExit("❌ No expenses to chart")
+
+    renderer = ChartRenderer()
+    try:
+        renderer.render_now(kind, data, args.dark, args.size).save(args.file)
+    finally:
+        renderer.shutdown()
+    print(f"✅ Chart saved to {os.path.basename(args.file)}", file=sys.stderr)
+    return 0
+
+
+def cmd_archive(db, args):
+    from ledgers import ShardedLedger
+
+    ledger = ShardedLedger(db.db_file, hot_years=args.hot_years)
+    years = ledger.archive_closed_years(db, lambda year: progress_line(f"⏳ Archiving {year}...\n"))
+    if not years:
+        print("ℹ️ Nothing to archive", file=sys.stderr)
+        return 0
+    print(f"✅ Archived {', '.join(map(str, years))} to {ledger.archive_dir}", file=sys.stderr)
+    return 0
+
+
+def cmd_totals(db, args):
+    filters = query_filters(args)
+    if args.ledgers:
+        from ledgers import LedgerSet
+
+        by_ledger = LedgerSet(args.ledgers).totals(args.by, **filters)
+    else:
+        from ledgers import ShardedLedger
+
+        by_ledger = {"": ShardedLedger(db.db_file).totals(args.by, **filters)}
+    for name, totals in by_ledger.items():
+        if name:
+            print(f"📒 {name}")
+        for key in sorted(totals, reverse=args.by == "month"):
+            total, count = totals[key]
+            print(f"  {key:<16}{format_money(total):>16}{count:>10,}")
+        print(f"  {'Total':<16}{format_money(sum(total for total, _ in totals.values())):>16}"
+              f"{sum(count for _, count in totals.values()):>10,}")
+    return 0
+
+
+# Argument parsing
+
+def parse_size(value):
+    try:
+        width, height = map(int, value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}', expected WIDTHxHEIGHT")
+    return (width, height)
+
+
+def add_filter_options(parser, search=True):
+    parser.add_argument("--from", dest="start", type=parse_day, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=parse_day, help="last day, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--category", type=parse_category)
+    if search:
+        parser.add_argument("--search", help="full-text search in comments and categories")
+    parser.add_argument("--chunk-size", type=int, default=5000, help=argparse.SUPPRESS)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Expense Tracker Pro from the command line")
+    parser.add_argument("--db", default="expenses.db", help="SQLite database (default: expenses.db)")
+    parser.add_argument("--json", default="expenses_data.json", help="legacy JSON file migrated on first open")
+    parser.add_argument("--perf", metavar="FILE", help="record query and hot-path timings and dump them to FILE as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add one expense")
+    add.add_argument("amount")
+    add.add_argument("category", type=parse_category)
+    add.add_argument("--comment")
+    add.add_argument("--date", help='"YYYY-MM-DD HH:MM" (default: now)')
+    add.set_defaults(handler=cmd_add)
+
+    bulk = commands.add_parser("import", help="bulk import a CSV or JSON statement")
+    bulk.add_argument("file")
+    bulk.add_argument("--map", action="append", metavar="FIELD=HEADER",
+                      help="use HEADER for FIELD (expense, category, comment, date) instead of guessing")
+    bulk.set_defaults(handler=cmd_import)
+
+    listing = commands.add_parser("list", help="print expenses, newest first")
+    add_filter_options(listing)
+    listing.add_argument("--format", choices=("csv", "table"), default="csv")
+    listing.set_defaults(handler=cmd_list)
+
+    summary = commands.add_parser("summary", help="spending and budgets for a month")
+    summary.add_argument("--month", help="YYYY-MM (default: this month)")
+    summary.set_defaults(handler=cmd_summary)
+
+    export = commands.add_parser("export", help="write expenses to a CSV file")
+    export.add_argument("file")
+    add_filter_options(export)
+    export.set_defaults(handler=cmd_export)
+
+    chart = commands.add_parser("chart", help="render a chart to a PNG file")
+    chart.add_argument("file")
+    chart.add_argument("--kind", choices=("category", "trend", "burn-down"), default="category")
+    chart.add_argument("--month", help="burn-down month, YYYY-MM (default: this month)")
+    chart.add_argument("--months", type=int, default=12, help="trend length in months (default: 12)")
+    chart.add_argument("--size", type=parse_size, default=(800, 600), help="WIDTHxHEIGHT pixels (default: 800x600)")
+    chart.add_argument("--dark", action="store_true", help="dark theme colors")
+    chart.set_defaults(handler=cmd_chart)
+
+    archive = commands.add_parser("archive", help="move closed years into read-only archive shards")
+    archive.add_argument("--hot-years", type=int, default=2,
+                         help="calendar years kept in the main database (default: 2, this year and last)")
+    archive.set_defaults(handler=cmd_archive)
+
+    totals = commands.add_parser("totals", help="totals by category or month across the archives")
+    add_filter_options(totals, search=False)
+    totals.add_argument("--by", choices=("category", "month"), default="category")
+    totals.add_argument("--ledgers", metavar="DIR", help="total every ledger under DIR (DIR/<name>/expenses.db)")
+    totals.set_defaults(handler=cmd_totals)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    perf.enabled = bool(args.perf)
+    try:
+        with DatabaseManager(args.db, args.json) as db:
+            migration_status, message = db.migration_result
+            if migration_status is not None:
+                print(message, file=sys.stderr)
+            return args.handler(db, args) or 0
+    except BrokenPipeError:
+        # Output piped into something like `head` that stopped reading
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except Exception as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if args.perf:
+            perf.dump(args.perf)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,86 +1,1007 @@
+import heapq
 import sqlite3
 import os
 import json
-from tkinter import messagebox
+import re
+import time
+from itertools import islice
+
+from dates import to_epoch, month_bounds
+from money import to_paise
+from perf import measure, timed
+
+JSON_MIGRATION_KEY = "json_migration"
+FTS_STALE_KEY = "fts_stale"
+ROLLUPS_STALE_KEY = "rollups_stale"
+LAST_OPTIMIZE_KEY = "last_optimize"
+LAST_VACUUM_KEY = "last_vacuum"
+# Bumped by every write transaction; the summary snapshot records the version it describes
+DATA_VERSION_KEY = "data_version"
+
+# PRAGMAs applied to every connection, by profile name. "default" keeps
+# SQLite's own settings (rollback journal, synchronous=FULL) for comparison.
+CONNECTION_PROFILES = {
+    "default": {},
+    # WAL with synchronous=NORMAL only fsyncs at checkpoints: a power cut can
+    # lose the last few commits but never corrupts the database
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,  # KiB when negative, per connection
+        "mmap_size": 256 * 2**20,
+        "temp_store": "MEMORY"
+    },
+    # Same, but every commit is fsynced
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -32000,
+        "mmap_size": 256 * 2**20,
+        "temp_store": "MEMORY"
+    }
+}
+DEFAULT_PROFILE = "tuned"
+
+# Schema version kept in PRAGMA user_version. New databases are created at
+# SCHEMA_VERSION, older ones are upgraded by the MIGRATIONS steps in order.
+SCHEMA_VERSION = 2
+MIGRATIONS = [
+    (1, "migrate_amounts_to_paise"),
+    (2, "migrate_dates_to_epoch")
+]
+
+# Amounts (expense, budget amount, rollup total) are integer paise, dates are
+# integer epoch seconds of the wall-clock time (see dates.py)
+EXPENSES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        expense INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        comment TEXT,
+        date INTEGER NOT NULL
+    )
+'''
+
+# The expenses table as of version 1, for the migration that produces it
+EXPENSES_TABLE_V1 = EXPENSES_TABLE.replace("date INTEGER", "date TEXT")
+
+BUDGETS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        PRIMARY KEY (month, category)
+    )
+'''
+
+# Budget row category holding the month's overall budget (salary)
+TOTAL_BUDGET = ""
+
+# Single-row cache of what the app shows first: row count, totals, per-category
+# {category: [sum, count]} as JSON and the newest page of history rows
+SUMMARY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS summary_snapshot (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        max_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        top_category TEXT,
+        totals TEXT NOT NULL,
+        latest TEXT NOT NULL,
+        updated INTEGER NOT NULL
+    )
+'''
+
+# History rows kept in the summary snapshot (one PagedExpenseView page)
+SUMMARY_PAGE_SIZE = 200
+
+# Rollup bucket of an expense row per period: the day, the Monday starting its week, the month
+ROLLUP_BUCKETS = {
+    "day": "date({row}date, 'unixepoch')",
+    "week": "date({row}date, 'unixepoch', 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', {row}date, 'unixepoch')"
+}
+
+
+def _rollup_add(row):
+    values = ",\n            ".join(
+        f"('{period}', {bucket.format(row=row)}, {row}category, {row}expense, 1)"
+        for period, bucket in ROLLUP_BUCKETS.items()
+    )
+    return f'''
+            INSERT INTO expense_rollups (period, bucket, category, total, count) VALUES
+            {values}
+            ON CONFLICT (period, bucket, category) DO UPDATE SET total = total + excluded.total, count = count + 1;'''
+
+
+def _rollup_remove(row):
+    # One statement per period so each is a primary key lookup
+    statements = []
+    for period, bucket in ROLLUP_BUCKETS.items():
+        where = f"period = '{period}' AND bucket = {bucket.format(row=row)} AND category = {row}category"
+        statements.append(f"UPDATE expense_rollups SET total = total - {row}expense, count = count - 1 WHERE {where};")
+        statements.append(f"DELETE FROM expense_rollups WHERE {where} AND count <= 0;")
+    return "\n            ".join([""] + statements)
+
+
+ROLLUP_TRIGGERS = {
+    "expense_rollups_insert": f'''
+        CREATE TRIGGER IF NOT EXISTS expense_rollups_insert AFTER INSERT ON expenses BEGIN{_rollup_add("new.")}
+        END
+    ''',
+    "expense_rollups_delete": f'''
+        CREATE TRIGGER IF NOT EXISTS expense_rollups_delete AFTER DELETE ON expenses BEGIN{_rollup_remove("old.")}
+        END
+    ''',
+    "expense_rollups_update": f'''
+        CREATE TRIGGER IF NOT EXISTS expense_rollups_update AFTER UPDATE OF expense, category, date ON expenses BEGIN{_rollup_remove("old.")}{_rollup_add("new.")}
+        END
+    '''
+}
+
+# Stay well below SQLite's default limit of 999 bound parameters
+ID_CHUNK_SIZE = 500
+
+FTS_TRIGGERS = {
+    "expenses_fts_insert": '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO expenses_fts(rowid, category, comment) VALUES (new.id, new.category, new.comment);
+        END
+    ''',
+    "expenses_fts_delete": '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+            INSERT INTO expenses_fts(expenses_fts, rowid, category, comment)
+            VALUES ('delete', old.id, old.category, old.comment);
+        END
+    ''',
+    "expenses_fts_update": '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE ON expenses BEGIN
+            INSERT INTO expenses_fts(expenses_fts, rowid, category, comment)
+            VALUES ('delete', old.id, old.category, old.comment);
+            INSERT INTO expenses_fts(rowid, category, comment) VALUES (new.id, new.category, new.comment);
+        END
+    '''
+}
+
+
+# Any character that cannot continue a JSON number
+NUMBER_END = re.compile(r"[^0-9.eE+-]")
+
+
+def iter_json_array(file, chunk_size=1 << 16):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = file.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("Unexpected end of JSON array")
+            return
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # A value ending exactly at the buffer edge may be cut short, and a
+            # number may have been decoded from a prefix such as "1." or "1.5e"
+            if not eof and (end == len(buffer) or (
+                    isinstance(item, (int, float)) and not NUMBER_END.search(buffer, end))):
+                raise json.JSONDecodeError("Item may be truncated", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+        pos = end
+
 
 class DatabaseManager:
-    def __init__(self, db_file="expenses.db", data_file="expenses_data.json"):
+    def __init__(self, db_file="expenses.db", data_file="expenses_data.json", progress=None, read_only=False,
+                 profile=DEFAULT_PROFILE):
+        """Open ``db_file`` with the PRAGMAs of ``profile`` (a CONNECTION_PROFILES name or a dict)
+
+        Use as a context manager, or call close(), to shut the connection
+        down explicitly.
+        """
         self.db_file = db_file
         self.data_file = data_file
-        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
-        self.cursor = self.conn.cursor()
-        self.setup_database()
+        self.read_only = read_only
+        self.profile = profile
+        # uri=True lets ATTACH take file: URIs (e.g. ?mode=ro); plain paths are unaffected
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False, uri=True)
+        self.fts_enabled = False
+        self.apply_profile(profile)
+        if read_only:
+            # Extra connection for concurrent reads; the schema belongs to the writer
+            self.conn.execute('PRAGMA query_only = ON')
+            self.fts_enabled = self.table_exists('expenses_fts')
+            self.migration_result = (None, None)
+            return
+        # (status, message) of the legacy JSON migration for the UI to report
+        self.migration_result = self.setup_database(progress)
+
+    def apply_profile(self, profile):
+        """Apply a connection profile's PRAGMAs to this connection"""
+        pragmas = CONNECTION_PROFILES[profile] if isinstance(profile, str) else profile
+        for name, value in pragmas.items():
+            if name == "journal_mode" and self.read_only:
+                # The journal mode belongs to the database file, which the writer sets
+                continue
+            self.conn.execute(f'PRAGMA {name} = {value}')
 
-    def setup_database(self):
+    def reader(self):
+        """Open a separate read-only connection to the same database"""
+        return DatabaseManager(self.db_file, self.data_file, read_only=True, profile=self.profile)
+
+    def setup_database(self, progress=None):
         """Initialize SQLite database and migrate JSON data if necessary"""
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                expense REAL NOT NULL,
-                category TEXT NOT NULL,
-                comment TEXT,
-                date TEXT NOT NULL
+        if self.table_exists('expenses'):
+            self.run_migrations(progress)
+        else:
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.execute(EXPENSES_TABLE.format(name="expenses"))
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses(category, date)')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
             )
         ''')
+        self.conn.execute(BUDGETS_TABLE.format(name="budgets"))
+        self.setup_fts()
+        self.setup_rollups()
+        self.conn.execute(SUMMARY_TABLE)
         self.conn.commit()
-        
-        # Migrate from JSON if it exists
-        if os.path.exists(self.data_file):
+
+        return self.migrate_json(progress)
+
+    def table_exists(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def schema_version(self):
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def run_migrations(self, progress=None):
+        """Upgrade an existing database to SCHEMA_VERSION
+
+        Each step runs in its own transaction together with the user_version
+        bump, so an interrupted upgrade leaves the database at the previous
+        version and is simply retried on the next start.
+        """
+        version = self.schema_version()
+        for target, step in MIGRATIONS:
+            if version >= target:
+                continue
             try:
-                with open(self.data_file, 'r') as file:
-                    json_data = json.load(file)
-                    for item in json_data:
-                        self.cursor.execute('''
+                with self.conn:
+                    # Explicit BEGIN so the DDL is part of the transaction
+                    self.conn.execute('BEGIN')
+                    getattr(self, step)(progress)
+                    # Derived from the old layout; rebuilt on demand
+                    self.conn.execute('DROP TABLE IF EXISTS summary_snapshot')
+                    self.conn.execute(f'PRAGMA user_version = {target}')
+            except Exception as e:
+                raise Exception(f"Failed to migrate database to version {target}: {str(e)}")
+            version = target
+
+    def _rebuild_table(self, name, schema, select, progress=None, batch_size=50_000):
+        """Copy ``name`` into a new table built from ``schema``, in rowid batches, and swap it in
+
+        ``select`` is the column list read from the old table; indexes and
+        triggers go with the old table and are recreated by setup_database.
+        """
+        sequence = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (name,)).fetchone()
+        self.conn.execute(schema.format(name=f"{name}_new"))
+        last_rowid = self.conn.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {name}').fetchone()[0]
+        copied = 0
+        for start in range(0, last_rowid, batch_size):
+            cursor = self.conn.execute(
+                f'INSERT INTO {name}_new SELECT {select} FROM {name} WHERE rowid > ? AND rowid <= ?',
+                (start, start + batch_size)
+            )
+            copied += cursor.rowcount
+            if progress:
+                progress(copied)
+        self.conn.execute(f'DROP TABLE {name}')
+        self.conn.execute(f'ALTER TABLE {name}_new RENAME TO {name}')
+        if sequence:
+            # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+            self.conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], name))
+
+    def migrate_amounts_to_paise(self, progress=None):
+        """Version 1: REAL rupee amounts become INTEGER paise"""
+        self._rebuild_table(
+            "expenses", EXPENSES_TABLE_V1,
+            "id, CAST(ROUND(expense * 100) AS INTEGER), category, comment, date", progress
+        )
+        if self.table_exists('budgets'):
+            self._rebuild_table("budgets", BUDGETS_TABLE, "month, category, CAST(ROUND(amount * 100) AS INTEGER)")
+        # setup_rollups recreates and refills it with integer totals
+        self.conn.execute('DROP TABLE IF EXISTS expense_rollups')
+
+    def migrate_dates_to_epoch(self, progress=None):
+        """Version 2: "YYYY-MM-DD HH:MM" text dates become INTEGER epoch seconds
+
+        Refuses to run while any date cannot be parsed, rather than turning it
+        into 1970; the error lists the offending ids so they can be fixed.
+        """
+        epoch = "COALESCE(CAST(strftime('%s', date) AS INTEGER), CAST(strftime('%s', substr(date, 1, 10)) AS INTEGER))"
+        bad = [row[0] for row in self.conn.execute(f'SELECT id FROM expenses WHERE {epoch} IS NULL ORDER BY id')]
+        if bad:
+            shown = ", ".join(str(expense_id) for expense_id in bad[:20])
+            more = f" and {len(bad) - 20} more" if len(bad) > 20 else ""
+            raise ValueError(f"{len(bad)} expenses have unreadable dates (ids {shown}{more})")
+        self._rebuild_table("expenses", EXPENSES_TABLE, f"id, expense, category, comment, {epoch}", progress)
+        # Rollup buckets are now computed from epoch dates
+        self.conn.execute('DROP TABLE IF EXISTS expense_rollups')
+
+    # Maintenance
+
+    def storage_stats(self):
+        """Page counts of the database file and the size of its write-ahead log"""
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        wal_file = self.db_file + "-wal"
+        return {
+            "page_size": page_size,
+            "pages": self.conn.execute('PRAGMA page_count').fetchone()[0],
+            "free_pages": self.conn.execute('PRAGMA freelist_count').fetchone()[0],
+            "wal_bytes": os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+        }
+
+    def checkpoint(self, mode="PASSIVE"):
+        """Copy the WAL back into the database, returns (busy, wal_pages, checkpointed_pages)
+
+        TRUNCATE also resets the WAL file to zero bytes when no reader is
+        still using it.
+        """
+        try:
+            return self.conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        except Exception as e:
+            raise Exception(f"Failed to checkpoint database: {str(e)}")
+
+    def optimize(self):
+        """Refresh the query planner statistics SQLite decides are stale"""
+        try:
+            self.conn.execute('PRAGMA optimize')
+            self.set_meta(LAST_OPTIMIZE_KEY, str(int(time.time())))
+            self.conn.commit()
+        except Exception as e:
+            raise Exception(f"Failed to optimize database: {str(e)}")
+
+    def vacuum(self):
+        """Rebuild the database file to return free pages to the disk"""
+        try:
+            self.conn.commit()
+            self.conn.execute('VACUUM')
+            with self.conn:
+                self.set_meta(LAST_VACUUM_KEY, str(int(time.time())))
+        except Exception as e:
+            raise Exception(f"Failed to vacuum database: {str(e)}")
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM app_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        """Store a metadata value (committed by the caller's transaction)"""
+        self.conn.execute('INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)', (key, value))
+
+    def migrate_json(self, progress=None, batch_size=5000):
+        """One-shot import of the legacy JSON file
+
+        Items are stream-parsed and inserted with executemany inside a single
+        transaction that also records a migration marker, so the import can
+        never run twice. The FTS index is rebuilt once at the end instead of
+        per row. ``progress(count)`` is called after every batch.
+        """
+        if not os.path.exists(self.data_file):
+            return None, None
+
+        backup = self.data_file + ".bak"
+        if self.get_meta(JSON_MIGRATION_KEY) is not None:
+            # Imported earlier but the rename did not happen; finish it without re-importing
+            os.replace(self.data_file, backup)
+            return None, None
+
+        try:
+            count = 0
+            # Many expenses share a date string; parse each one once
+            epochs = {}
+
+            def epoch(date):
+                if date not in epochs:
+                    epochs[date] = to_epoch(date)
+                return epochs[date]
+
+            with open(self.data_file, 'r', encoding='utf-8') as file:
+                rows = (
+                    (to_paise(item['expense']), item['category'], item.get('comment') or "N/A", epoch(item['date']))
+                    for item in iter_json_array(file)
+                )
+                with self.conn:
+                    # Explicit BEGIN so the trigger DDL is part of the transaction
+                    self.conn.execute('BEGIN')
+                    self.begin_bulk_insert()
+                    while True:
+                        batch = list(islice(rows, batch_size))
+                        if not batch:
+                            break
+                        self.conn.executemany('''
                             INSERT INTO expenses (expense, category, comment, date)
                             VALUES (?, ?, ?, ?)
-                        ''', (item['expense'], item['category'], item['comment'], item['date']))
-                self.conn.commit()
-                # Backup and rename JSON file
-                os.rename(self.data_file, self.data_file + ".bak")
-                return True, "Successfully migrated data to database."
-            except Exception as e:
-                return False, f"Failed to migrate data: {str(e)}"
-        return None, None
+                        ''', batch)
+                        count += len(batch)
+                        if progress:
+                            progress(count)
+                    self.end_bulk_insert()
+                    self.set_meta(JSON_MIGRATION_KEY, json.dumps({"file": os.path.basename(self.data_file), "rows": count}))
+            # Backup and rename JSON file
+            os.replace(self.data_file, backup)
+            return True, f"Successfully migrated {count} expenses to database."
+        except Exception as e:
+            return False, f"Failed to migrate data: {str(e)}"
+
+    def setup_fts(self):
+        """Create the FTS5 trigram index over category/comment when SQLite supports it"""
+        exists = self.table_exists('expenses_fts')
+        if not exists:
+            try:
+                self.conn.execute('''
+                    CREATE VIRTUAL TABLE expenses_fts USING fts5(
+                        category, comment, content='expenses', content_rowid='id', tokenize='trigram'
+                    )
+                ''')
+            except sqlite3.OperationalError:
+                # No FTS5 or no trigram tokenizer: text search falls back to LIKE
+                self.fts_enabled = False
+                return
+            self.conn.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+        elif self.get_meta(FTS_STALE_KEY) is not None:
+            # A bulk load stopped before it could rebuild the index
+            self.conn.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+            self.conn.execute('DELETE FROM app_meta WHERE key = ?', (FTS_STALE_KEY,))
+        self.fts_enabled = True
+        self.create_fts_triggers()
+
+    def setup_rollups(self):
+        """Create the day/week/month rollup table, filling it from existing expenses if needed"""
+        exists = self.table_exists('expense_rollups')
+        if not exists:
+            self.conn.execute('''
+                CREATE TABLE expense_rollups (
+                    period TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (period, bucket, category)
+                ) WITHOUT ROWID
+            ''')
+        if not exists or self.get_meta(ROLLUPS_STALE_KEY) is not None:
+            self.rebuild_rollups()
+            self.conn.execute('DELETE FROM app_meta WHERE key = ?', (ROLLUPS_STALE_KEY,))
+        self.create_rollup_triggers()
+
+    def rebuild_rollups(self):
+        """Recompute every rollup bucket with one GROUP BY per period"""
+        self.conn.execute('DELETE FROM expense_rollups')
+        for period, bucket in ROLLUP_BUCKETS.items():
+            self.conn.execute(f'''
+                INSERT INTO expense_rollups (period, bucket, category, total, count)
+                SELECT '{period}', {bucket.format(row="")}, category, SUM(expense), COUNT(*)
+                FROM expenses GROUP BY 2, 3
+            ''')
+
+    def create_rollup_triggers(self):
+        for sql in ROLLUP_TRIGGERS.values():
+            self.conn.execute(sql)
+
+    def drop_rollup_triggers(self):
+        for name in ROLLUP_TRIGGERS:
+            self.conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    def create_fts_triggers(self):
+        for sql in FTS_TRIGGERS.values():
+            self.conn.execute(sql)
+
+    def drop_fts_triggers(self):
+        for name in FTS_TRIGGERS:
+            self.conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    def data_version(self):
+        return int(self.get_meta(DATA_VERSION_KEY, 0))
+
+    def _bump_data_version(self):
+        """Advance the data version in the caller's transaction, returns the new version"""
+        version = self.data_version() + 1
+        self.set_meta(DATA_VERSION_KEY, str(version))
+        return version
+
+    def _summary_totals(self):
+        """{category: [sum, count]} from the month rollups, or the table itself while they are stale"""
+        if self.get_meta(ROLLUPS_STALE_KEY) is None:
+            totals = self.rollup_by_category("month")
+        else:
+            totals = self.totals_by_category()
+        return {category: [total, count] for category, (total, count) in totals.items()}
+
+    def _write_summary(self, version, totals, latest=None):
+        """Store the summary snapshot of ``version`` (in the caller's transaction)
+
+        ``latest`` is the newest page of (id, expense, category, comment, date)
+        rows, read from the table when not given.
+        """
+        if latest is None:
+            latest = self.conn.execute(
+                'SELECT id, expense, category, comment, date FROM expenses ORDER BY date DESC, id DESC LIMIT ?',
+                (SUMMARY_PAGE_SIZE,)
+            ).fetchall()
+        top_category = max(totals, key=lambda category: totals[category][0]) if totals else None
+        self.conn.execute('''
+            INSERT OR REPLACE INTO summary_snapshot
+                (id, version, row_count, max_id, total, top_category, totals, latest, updated)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            version,
+            sum(count for _, count in totals.values()),
+            self.max_expense_id(),
+            sum(total for total, _ in totals.values()),
+            top_category,
+            json.dumps(totals),
+            json.dumps(latest),
+            int(time.time())
+        ))
+
+    def _record_write(self, added=(), removed=()):
+        """Advance the data version and keep a current summary snapshot current
+
+        Runs inside the write's own transaction. ``added`` holds the new
+        (id, expense, category, comment, date) rows and ``removed`` the
+        (id, expense, category) of deleted ones. Totals are adjusted by them
+        and new rows merged into the stored newest page; the page is only
+        re-read when a deletion reaches into it. A snapshot that was already
+        stale is left for rebuild_summary_snapshot.
+        """
+        row = self.conn.execute('SELECT version, totals, latest FROM summary_snapshot WHERE id = 1').fetchone()
+        previous = self.data_version()
+        version = self._bump_data_version()
+        if row is None or row[0] != previous:
+            return
+        totals = json.loads(row[1])
+        latest = json.loads(row[2])
+        for _, expense, category, _, _ in added:
+            entry = totals.setdefault(category, [0, 0])
+            entry[0] += expense
+            entry[1] += 1
+        if added:
+            # The new first page is drawn from the old one and the added rows
+            latest = heapq.nlargest(SUMMARY_PAGE_SIZE, latest + list(added), key=lambda item: (item[4], item[0]))
+        removed_ids = {expense_id for expense_id, _, _ in removed}
+        if any(item[0] in removed_ids for item in latest):
+            if len(latest) < SUMMARY_PAGE_SIZE:
+                # The page held every row, nothing to refill it from
+                latest = [item for item in latest if item[0] not in removed_ids]
+            else:
+                latest = None
+        for _, expense, category in removed:
+            entry = totals.get(category)
+            if entry is None:
+                continue
+            entry[0] -= expense
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del totals[category]
+        self._write_summary(version, totals, latest)
+
+    def rebuild_summary_snapshot(self):
+        """Recompute the summary snapshot for the current data (from the rollups, so no table scan)"""
+        try:
+            with self.conn:
+                self._write_summary(self.data_version(), self._summary_totals())
+        except Exception as e:
+            raise Exception(f"Failed to rebuild summary snapshot: {str(e)}")
+
+    @timed("db.summary_snapshot")
+    def summary_snapshot(self):
+        """The persisted summary if it still describes the table, else None
+
+        Current means taken at the current data version with the same
+        MAX(id), read in one statement so a concurrent write cannot land
+        between the checks. Returns count, total, top_category, totals as
+        {category: (sum, count)} and latest, the newest page of row dicts.
+        """
+        if not self.table_exists('summary_snapshot'):
+            return None
+        row = self.conn.execute('''
+            SELECT s.version, s.row_count, s.max_id, s.total, s.top_category, s.totals, s.latest,
+                   (SELECT value FROM app_meta WHERE key = ?), (SELECT COALESCE(MAX(id), 0) FROM expenses)
+            FROM summary_snapshot AS s WHERE s.id = 1
+        ''', (DATA_VERSION_KEY,)).fetchone()
+        if row is None or row[0] != int(row[7] or 0) or row[2] != row[8]:
+            return None
+        return {
+            "count": row[1],
+            "total": row[3],
+            "top_category": row[4],
+            "totals": {category: tuple(value) for category, value in json.loads(row[5]).items()},
+            "latest": [self._row_to_dict(item) for item in json.loads(row[6])]
+        }
+
+    def begin_bulk_insert(self):
+        """Suspend per-row FTS and rollup maintenance inside a bulk-load transaction"""
+        # Leaves the summary snapshot stale until end_bulk_insert rewrites it
+        self._bump_data_version()
+        self.drop_rollup_triggers()
+        # Lets setup_rollups/setup_fts repair things if we never reach end_bulk_insert
+        self.set_meta(ROLLUPS_STALE_KEY, "1")
+        if self.fts_enabled:
+            self.drop_fts_triggers()
+            self.set_meta(FTS_STALE_KEY, "1")
+
+    def end_bulk_insert(self):
+        """Rebuild the FTS index and the rollups once and restore the triggers"""
+        self.rebuild_rollups()
+        self.create_rollup_triggers()
+        self.conn.execute('DELETE FROM app_meta WHERE key = ?', (ROLLUPS_STALE_KEY,))
+        if self.fts_enabled:
+            self.conn.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+            self.create_fts_triggers()
+            self.conn.execute('DELETE FROM app_meta WHERE key = ?', (FTS_STALE_KEY,))
+        self._write_summary(self._bump_data_version(), self._summary_totals())
+
+    def suspend_triggers(self):
+        """begin_bulk_insert as its own transaction, for loads spanning many commits"""
+        with self.conn:
+            self.conn.execute('BEGIN')
+            self.begin_bulk_insert()
+
+    def resume_triggers(self):
+        with self.conn:
+            self.conn.execute('BEGIN')
+            self.end_bulk_insert()
+
+    @staticmethod
+    def _row_to_dict(row):
+        return {
+            "id": row[0],
+            "expense": row[1],
+            "category": row[2],
+            "comment": row[3],
+            "date": row[4]
+        }
+
+    def _filters(self, start=None, end=None, category=None, text=None):
+        """Build a WHERE clause for the shared query filters (epoch seconds, end is exclusive)"""
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("date < ?")
+            params.append(end)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if text:
+            # Trigram FTS needs at least three characters, shorter terms use LIKE
+            if self.fts_enabled and len(text) >= 3:
+                clauses.append("id IN (SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ?)")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(comment LIKE ? ESCAPE '\\' OR category LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    @timed("db.query_expenses")
+    def query_expenses(self, start=None, end=None, category=None, text=None, limit=None, offset=0, after=None):
+        """Newest-first page of expenses matching the filters
+
+        Pass ``after=(date, id)`` of the last row of the previous page for
+        keyset pagination, or ``offset`` for plain LIMIT/OFFSET paging.
+        """
+        try:
+            where, params = self._filters(start, end, category, text)
+            if after is not None:
+                where += " AND " if where else " WHERE "
+                where += "(date < ? OR (date = ? AND id < ?))"
+                params.extend([after[0], after[0], after[1]])
+            sql = f'SELECT id, expense, category, comment, date FROM expenses{where} ORDER BY date DESC, id DESC'
+            if limit is not None:
+                sql += ' LIMIT ? OFFSET ?'
+                params.extend([limit, offset])
+            return [self._row_to_dict(row) for row in self.conn.execute(sql, params)]
+        except Exception as e:
+            raise Exception(f"Failed to query expenses: {str(e)}")
+
+    def iter_expense_chunks(self, chunk_size=1000, start=None, end=None, category=None, text=None, max_id=None,
+                            ordered=True):
+        """Stream newest-first (id, expense, category, comment, date) tuples in chunks
+
+        Uses its own cursor, so it can be consumed while other queries run on
+        this connection. ``max_id`` limits the rows to ids up to that value.
+        ``ordered=False`` returns rows in id order, which skips walking the
+        date index and is much faster for whole-ledger scans.
+        """
+        where, params = self._filters(start, end, category, text)
+        if max_id is not None:
+            where += " AND " if where else " WHERE "
+            where += "id <= ?"
+            params.append(max_id)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                f'SELECT id, expense, category, comment, date FROM expenses{where}{" ORDER BY date DESC, id DESC" if ordered else ""}',
+                params
+            )
+            while True:
+                with measure("db.iter_expense_chunks"):
+                    rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    @timed("db.get_expenses")
+    def get_expenses(self, expense_ids):
+        """Fetch specific expenses by id"""
+        ids = list(expense_ids)
+        expenses = []
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            chunk = ids[start:start + ID_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f'SELECT id, expense, category, comment, date FROM expenses WHERE id IN ({placeholders})', chunk
+            )
+            expenses.extend(self._row_to_dict(row) for row in rows)
+        return expenses
+
+    def max_expense_id(self):
+        return self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM expenses').fetchone()[0]
+
+    @timed("db.count_expenses")
+    def count_expenses(self, start=None, end=None, category=None, text=None):
+        """Number of expenses matching the filters"""
+        where, params = self._filters(start, end, category, text)
+        return self.conn.execute(f'SELECT COUNT(*) FROM expenses{where}', params).fetchone()[0]
+
+    @timed("db.sum_expenses")
+    def sum_expenses(self, start=None, end=None, category=None, text=None):
+        """Total amount of the expenses matching the filters"""
+        where, params = self._filters(start, end, category, text)
+        return self.conn.execute(f'SELECT COALESCE(SUM(expense), 0) FROM expenses{where}', params).fetchone()[0]
+
+    @timed("db.sum_by_category")
+    def sum_by_category(self, start=None, end=None, text=None):
+        """Per-category totals for the expenses matching the filters"""
+        where, params = self._filters(start, end, None, text)
+        rows = self.conn.execute(
+            f'SELECT category, SUM(expense) FROM expenses{where} GROUP BY category', params
+        )
+        return dict(rows.fetchall())
+
+    @timed("db.totals_by_category")
+    def totals_by_category(self):
+        """{category: (sum, count)} over the whole ledger"""
+        rows = self.conn.execute('SELECT category, SUM(expense), COUNT(*) FROM expenses GROUP BY category')
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    @timed("db.totals_by_month")
+    def totals_by_month(self):
+        """{"YYYY-MM": (sum, count)} over the whole ledger"""
+        rows = self.conn.execute(
+            "SELECT strftime('%Y-%m', date, 'unixepoch') AS month, SUM(expense), COUNT(*) FROM expenses GROUP BY month"
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def expenses_between(self, start, end, category=None):
+        """Expenses dated in [start, end) newest first, as a seek on the date index
+
+        ``start`` and ``end`` are epoch seconds, datetimes, dates or date strings.
+        """
+        return self.query_expenses(start=to_epoch(start), end=to_epoch(end), category=category)
+
+    @staticmethod
+    def month_bounds(month):
+        """(start, end) epoch seconds of a "YYYY-MM" month, for expenses_between and the filters"""
+        return month_bounds(month)
+
+    @timed("db.rollup_totals")
+    def rollup_totals(self, period, start=None, end=None, category=None):
+        """[(bucket, total, count)] per ``period`` bucket in [start, end), oldest first
+
+        Read from the rollup table, so the cost depends on the number of
+        buckets asked for and not on the number of expenses.
+        """
+        clauses = ["period = ?"]
+        params = [period]
+        if start is not None:
+            clauses.append("bucket >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("bucket < ?")
+            params.append(end)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        rows = self.conn.execute(
+            f'SELECT bucket, SUM(total), SUM(count) FROM expense_rollups WHERE {" AND ".join(clauses)} '
+            'GROUP BY bucket ORDER BY bucket',
+            params
+        )
+        return rows.fetchall()
+
+    @timed("db.rollup_by_category")
+    def rollup_by_category(self, period, start=None, end=None):
+        """{category: (total, count)} over the ``period`` buckets in [start, end)"""
+        clauses = ["period = ?"]
+        params = [period]
+        if start is not None:
+            clauses.append("bucket >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("bucket < ?")
+            params.append(end)
+        rows = self.conn.execute(
+            f'SELECT category, SUM(total), SUM(count) FROM expense_rollups WHERE {" AND ".join(clauses)} GROUP BY category',
+            params
+        )
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    @timed("db.budgets_for")
+    def budgets_for(self, month):
+        """{category: amount} in effect for ``month`` ("YYYY-MM")
 
+        A budget set for a month carries forward until a later month sets
+        it again. The overall monthly budget is keyed by TOTAL_BUDGET.
+        """
+        rows = self.conn.execute('''
+            SELECT category, amount FROM budgets AS b
+            WHERE month = (SELECT MAX(month) FROM budgets WHERE category = b.category AND month <= ?)
+        ''', (month,))
+        return {category: amount for category, amount in rows if amount > 0}
+
+    @timed("db.set_budgets")
+    def set_budgets(self, month, budgets):
+        """Set budgets from ``month`` on in one transaction; an amount of 0 or None clears one"""
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO budgets (month, category, amount) VALUES (?, ?, ?)',
+                    [(month, category, amount or 0) for category, amount in budgets.items()]
+                )
+            return self.budgets_for(month)
+        except Exception as e:
+            raise Exception(f"Failed to save budgets: {str(e)}")
+
+    @timed("db.load_expenses")
     def load_expenses(self):
         """Load expenses from database"""
         try:
-            self.cursor.execute('SELECT id, expense, category, comment, date FROM expenses ORDER BY date DESC')
-            rows = self.cursor.fetchall()
-            expenses = []
-            for row in rows:
-                expenses.append({
-                    "id": row[0],
-                    "expense": row[1],
-                    "category": row[2],
-                    "comment": row[3],
-                    "date": row[4]
-                })
-            return expenses
+            cursor = self.conn.execute('SELECT id, expense, category, comment, date FROM expenses ORDER BY date DESC, id DESC')
+            return [self._row_to_dict(row) for row in cursor]
         except Exception as e:
             raise Exception(f"Failed to load expenses: {str(e)}")
 
+    @timed("db.add_expense")
     def add_expense(self, expense, category, comment, date):
-        """Add a new expense to the database"""
+        """Add a new expense (amount in paise) to the database and return its row id"""
         try:
-            self.cursor.execute('''
+            expense_id = self.conn.execute('''
                 INSERT INTO expenses (expense, category, comment, date)
                 VALUES (?, ?, ?, ?)
-            ''', (expense, category, comment, date))
+            ''', (expense, category, comment, date)).lastrowid
+            self._record_write(added=[(expense_id, expense, category, comment, date)])
             self.conn.commit()
-            return True
+            return expense_id
         except Exception as e:
+            self.conn.rollback()
             raise Exception(f"Failed to save expense: {str(e)}")
 
+    @timed("db.delete_expense")
     def delete_expense(self, expense_id):
         """Delete an expense by ID"""
         try:
-            self.cursor.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
+            removed = self.conn.execute('SELECT id, expense, category FROM expenses WHERE id = ?', (expense_id,)).fetchall()
+            self.conn.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
+            self._record_write(removed=removed)
             self.conn.commit()
             return True
         except Exception as e:
+            self.conn.rollback()
             raise Exception(f"Failed to delete expense: {str(e)}")
 
+    @timed("db.add_expenses")
+    def add_expenses(self, rows):
+        """Insert many (expense, category, comment, date) rows in one transaction
+
+        Returns the new row ids in insertion order.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                    INSERT INTO expenses (expense, category, comment, date)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+                # AUTOINCREMENT ids are consecutive within a single-writer transaction
+                last_id = self.conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                ids = list(range(last_id - len(rows) + 1, last_id + 1))
+                self._record_write(added=[(expense_id, *row) for expense_id, row in zip(ids, rows)])
+            return ids
+        except Exception as e:
+            raise Exception(f"Failed to save expenses: {str(e)}")
+
+    @timed("db.delete_expenses")
+    def delete_expenses(self, expense_ids):
+        """Delete many expenses in one transaction, returns the ids that existed"""
+        ids = list(expense_ids)
+        removed = []
+        try:
+            with self.conn:
+                for start in range(0, len(ids), ID_CHUNK_SIZE):
+                    chunk = ids[start:start + ID_CHUNK_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    found = self.conn.execute(
+                        f'SELECT id, expense, category FROM expenses WHERE id IN ({placeholders})', chunk
+                    )
+                    removed.extend(found)
+                    self.conn.execute(f'DELETE FROM expenses WHERE id IN ({placeholders})', chunk)
+                self._record_write(removed=removed)
+            return [expense_id for expense_id, _, _ in removed]
+        except Exception as e:
+            raise Exception(f"Failed to delete expenses: {str(e)}")
+
+    def close(self, optimize=True):
+        """Close the connection (idempotent); the writer runs PRAGMA optimize first"""
+        conn = getattr(self, 'conn', None)
+        if conn is None:
+            return
+        self.conn = None
+        try:
+            if optimize and not self.read_only:
+                conn.execute('PRAGMA optimize')
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def __del__(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        # Last resort only: owners close explicitly
+        self.close(optimize=False)
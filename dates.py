@@ -0,0 +1,58 @@
+import datetime
+from functools import lru_cache
+
+# Dates are stored as integer seconds since 1970-01-01, counting the wall-clock
+# time as if it were UTC. That keeps them free of time zone and DST shifts and
+# matches SQLite's strftime('%s', ...) and 'unixepoch' conversions.
+EPOCH = datetime.datetime(1970, 1, 1)
+DISPLAY_FORMAT = "%Y-%m-%d %H:%M"
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch(value):
+    """Epoch seconds for a datetime, a date or a "YYYY-MM-DD[ HH:MM]" string (ints pass through)"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        value = datetime.datetime.strptime(value, DISPLAY_FORMAT if len(value) > 10 else "%Y-%m-%d")
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return int((value.replace(tzinfo=None) - EPOCH).total_seconds())
+
+
+def from_epoch(seconds):
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+
+@lru_cache(maxsize=65536)
+def _day_text(day):
+    return (EPOCH + datetime.timedelta(days=day)).strftime("%Y-%m-%d")
+
+
+def format_date(seconds):
+    """Epoch seconds as "YYYY-MM-DD HH:MM" for display
+
+    Only the date part goes through strftime, cached per day, since exports
+    and listings format every row.
+    """
+    day, rest = divmod(seconds, SECONDS_PER_DAY)
+    return f"{_day_text(day)} {rest // 3600:02d}:{rest // 60 % 60:02d}"
+
+
+@lru_cache(maxsize=65536)
+def _month_of_day(day):
+    return from_epoch(day * SECONDS_PER_DAY).strftime("%Y-%m")
+
+
+def month_of(seconds):
+    """Month ("YYYY-MM") of an epoch timestamp"""
+    return _month_of_day(seconds // SECONDS_PER_DAY)
+
+
+def month_bounds(month):
+    """(start, end) epoch seconds of a "YYYY-MM" month, end exclusive"""
+    year, month_number = map(int, month.split("-"))
+    start = datetime.datetime(year, month_number, 1)
+    end = datetime.datetime(year + month_number // 12, month_number % 12 + 1, 1)
+    return to_epoch(start), to_epoch(end)
@@ -0,0 +1,114 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DatabaseExecutor:
+    """Runs database work off the Tk main loop.
+
+    Writes go to a single worker thread that owns the DatabaseManager's
+    connection, so they are serialized. Reads run on a small pool of threads
+    with their own read-only WAL connections and can proceed while a write is
+    in flight; pass ``reader`` (e.g. a ShardedLedger, which pools its own
+    connections) to have every read job use that shared, thread-safe object
+    instead. Each job is called as ``func(db, *args)`` and returns a Future;
+    ``on_done``/``on_error`` callbacks are delivered on the Tk thread through
+    ``root.after`` (or directly on the worker when there is no root).
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, db, root=None, readers=2, error_handler=None, reader=None):
+        self.db = db
+        self.root = root
+        self.reader = reader
+        self.error_handler = error_handler
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        self._local = threading.local()
+        self._reader_dbs = []
+        self._results = queue.Queue()
+        self._pending = 0
+        self._polling = False
+
+    def write(self, func, *args, on_done=None, on_error=None):
+        """Queue a write job on the writer thread"""
+        return self._submit(self._writer, self._run_write, func, args, on_done, on_error)
+
+    def read(self, func, *args, on_done=None, on_error=None):
+        """Queue a read job on the reader pool"""
+        return self._submit(self._readers, self._run_read, func, args, on_done, on_error)
+
+    def post(self, callback, *args):
+        """Run ``callback(*args)`` on the Tk thread; callable from any thread
+
+        Meant for progress updates from a running job, which keeps the poll
+        loop alive while it is pending.
+        """
+        if self.root is None:
+            callback(*args)
+        else:
+            self._results.put((None, callback, args))
+
+    def _run_write(self, func, args):
+        return func(self.db, *args)
+
+    def _run_read(self, func, args):
+        if self.reader is not None:
+            return func(self.reader, *args)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self.db.reader()
+            self._reader_dbs.append(db)
+        return func(db, *args)
+
+    def _submit(self, pool, runner, func, args, on_done, on_error):
+        future = pool.submit(runner, func, args)
+        if self.root is None:
+            future.add_done_callback(lambda fut: self._dispatch(fut, on_done, on_error))
+            return future
+
+        self._pending += 1
+        future.add_done_callback(lambda fut: self._results.put((fut, on_done, on_error)))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        """Deliver finished jobs on the Tk thread, polling only while work is pending"""
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] is None:
+                _, callback, args = item
+                callback(*args)
+                continue
+            future, on_done, on_error = item
+            self._pending -= 1
+            self._dispatch(future, on_done, on_error)
+        if self._pending > 0:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _dispatch(self, future, on_done, on_error):
+        error = future.exception()
+        if error is not None:
+            handler = on_error or self.error_handler
+            if handler is None:
+                raise error
+            handler(error)
+        elif on_done is not None:
+            on_done(future.result())
+
+    def shutdown(self, wait=True):
+        """Finish queued work, stop the worker threads and close their reader connections"""
+        self._readers.shutdown(wait=wait)
+        self._writer.shutdown(wait=wait)
+        if wait:
+            for db in self._reader_dbs:
+                db.close()
+            self._reader_dbs.clear()
@@ -0,0 +1,412 @@
+import bisect
+import datetime
+from collections import OrderedDict
+
+from analytics import shift_bucket
+from expense_table import ExpenseTable
+
+# Stands in for a row of a PagedExpenseView page that is still being read
+LOADING_ROW = {"id": None, "expense": None, "category": "", "comment": "⏳ Loading...", "date": None}
+
+
+class PagedExpenseView:
+    """Read-only newest-first sequence of expenses fetched from SQLite a page at a time.
+
+    Only a handful of recently used pages are kept in memory. A page that
+    directly follows a cached one is fetched with keyset pagination, other
+    pages fall back to LIMIT/OFFSET.
+
+    With an ``executor`` (a DatabaseExecutor) nothing is read on the calling
+    thread: the count and missing pages are read on its reader pool, rows not
+    read yet are LOADING_ROW, and ``on_loaded(view)`` is called on the Tk
+    thread whenever a result arrives. Without one, reads are synchronous on
+    ``db``.
+    """
+
+    def __init__(self, db, page_size=200, max_pages=8, count=None, first_page=None, executor=None,
+                 on_loaded=None, **filters):
+        """``first_page`` primes page 0 with rows already at hand (the persisted summary's)"""
+        self.db = db
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.executor = executor
+        self.on_loaded = on_loaded
+        self.filters = filters
+        self._pages = OrderedDict()
+        self._loading = set()
+        # Bumped by invalidate, so reads started before it are dropped
+        self._generation = 0
+        self._len = 0
+        self._set_count(count)
+        if first_page is not None and len(first_page) == min(page_size, self._len):
+            self._pages[0] = first_page
+
+    def invalidate(self, count=None):
+        """Forget cached pages after a write; ``count`` skips the COUNT(*) query"""
+        self._pages.clear()
+        self._loading.clear()
+        self._generation += 1
+        self._set_count(count)
+
+    def _set_count(self, count):
+        if count is not None:
+            self._len = count
+        elif self.executor is None:
+            self._len = self.db.count_expenses(**self.filters)
+        else:
+            generation = self._generation
+            self.executor.read(
+                lambda db: db.count_expenses(**self.filters),
+                on_done=lambda count: self._counted(generation, count)
+            )
+
+    def _counted(self, generation, count):
+        if generation == self._generation:
+            self._len = count
+            self._loaded()
+
+    def _loaded(self):
+        if self.on_loaded is not None:
+            self.on_loaded(self)
+
+    def _read_page(self, db, number, after):
+        if after is not None:
+            return db.query_expenses(limit=self.page_size, after=after, **self.filters)
+        return db.query_expenses(limit=self.page_size, offset=number * self.page_size, **self.filters)
+
+    def _page(self, number):
+        """Page ``number``, or None while it is being read in the background"""
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        previous = self._pages.get(number - 1)
+        after = (previous[-1]['date'], previous[-1]['id']) if previous else None
+        if self.executor is None:
+            self._store_page(number, self._read_page(self.db, number, after))
+            return self._pages[number]
+        if number not in self._loading:
+            self._loading.add(number)
+            generation = self._generation
+            self.executor.read(
+                self._read_page, number, after,
+                on_done=lambda page: self._page_read(generation, number, page)
+            )
+        return None
+
+    def _page_read(self, generation, number, page):
+        if generation != self._generation:
+            return
+        self._loading.discard(number)
+        self._store_page(number, page)
+        self._loaded()
+
+    def _store_page(self, number, page):
+        self._pages[number] = page
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("expense index out of range")
+        page = self._page(index // self.page_size)
+        if page is None:
+            return LOADING_ROW
+        offset = index % self.page_size
+        if offset >= len(page):
+            raise IndexError("expense index out of range")
+        return page[offset]
+
+
+class ExpenseStore:
+    """Ordered in-memory collection of expenses kept in step with the database.
+
+    Rows are dicts with the amount in integer paise, exposed newest first
+    (by date, then id). Inserts and deletes are
+    applied incrementally using the row id SQLite hands back, and every change
+    is announced to listeners as ``listener(event, rows)`` where ``event`` is
+    one of ``"reset"``, ``"insert"`` or ``"delete"``, or ``"loaded"`` when
+    rows of the paged view arrive from a background read (nothing changed).
+
+    In memory the rows live in a columnar ExpenseTable (a few dozen bytes a
+    row instead of a dict); indexing and iteration build the row dicts on
+    the fly, and ``sum_by_category`` groups the columns vectorized. Ledgers
+    larger than ``max_in_memory`` rows are not loaded at all: the store
+    switches to paged mode and serves rows from a PagedExpenseView.
+
+    Database work is split from the in-memory update so it can run on a
+    worker thread: ``fetch``, ``insert_row`` and ``delete_rows`` only touch
+    the database they are given, ``apply_*`` only touch memory. ``load``,
+    ``add`` and ``delete`` do both synchronously. Reads made on behalf of the
+    caller's thread (paged views) use ``reader``, which defaults to ``db``,
+    or go through ``executor`` when one is given so they never block it.
+    """
+
+    def __init__(self, db, max_in_memory=200_000, reader=None, executor=None):
+        self.db = db
+        self.reader = reader or db
+        self.executor = executor
+        self.max_in_memory = max_in_memory
+        self.paged = False
+        self.loaded_totals = {}
+        self.loaded_period = None
+        self._view = None
+        # Stored oldest first so new rows usually land at the end of the columns
+        self._table = ExpenseTable()
+        self._keys = self._table.sort_keys()
+        # id -> date, enough to bisect to a row by its sort key
+        self._dates = {}
+        self._listeners = []
+        # Bumped whenever a database write is submitted or completes, see unchanged_since
+        self.write_epoch = 0
+        self._writes_in_flight = 0
+
+    @staticmethod
+    def sort_key(row):
+        return (row['date'], row['id'])
+
+    def subscribe(self, listener):
+        """Register a callback for store changes"""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event, rows):
+        for listener in list(self._listeners):
+            listener(event, rows)
+
+    def fetch(self, db, summary_only=False):
+        """Read everything a reload needs (safe on a worker thread)
+
+        With ``summary_only`` no rows are read; applying that snapshot leaves
+        the store in paged mode, which is enough to show totals and the first
+        page of history while the full load runs.
+        """
+        count = db.count_expenses()
+        rows = None
+        if not summary_only and self.fits_in_memory(count):
+            # Built here rather than in apply_load, so the worker pays for it
+            rows = ExpenseTable.from_db(db, ordered=True)
+            rows.reverse()
+        return {"count": count, "rows": rows, "totals": db.totals_by_category(), "period": self.fetch_period(db)}
+
+    @staticmethod
+    def fetch_period(db, month=None):
+        """(month, {category: (sum, count)}) spent in ``month`` (default: this month), from the rollups"""
+        month = month or datetime.date.today().strftime("%Y-%m")
+        return month, db.rollup_by_category("month", month, shift_bucket("month", month, 1))
+
+    def fetch_persisted(self, db):
+        """Startup read: the database's persisted summary snapshot, falling back to ``fetch(db, True)``
+
+        A current snapshot costs one row read instead of a COUNT(*) and a
+        GROUP BY over the whole table, and brings the first page of history
+        along. ``persisted`` in the result says which one was used.
+        """
+        summary = db.summary_snapshot()
+        if summary is None:
+            return dict(self.fetch(db, summary_only=True), persisted=False)
+        return {"count": summary["count"], "rows": None, "totals": summary["totals"],
+                "latest": summary["latest"], "period": self.fetch_period(db), "persisted": True}
+
+    def begin_write(self):
+        """Record a write handed to a worker; end_write follows once its result is back"""
+        self._writes_in_flight += 1
+        self.write_epoch += 1
+
+    def end_write(self):
+        self._writes_in_flight -= 1
+        self.write_epoch += 1
+
+    def writes_pending(self):
+        return self._writes_in_flight > 0
+
+    def unchanged_since(self, epoch):
+        """True if no write started, finished or is still running since ``write_epoch`` was ``epoch``
+
+        Only then is a fetch made in between known to match the in-memory
+        state it would replace.
+        """
+        return epoch == self.write_epoch and self._writes_in_flight == 0
+
+    def fits_in_memory(self, count):
+        return self.max_in_memory is None or count <= self.max_in_memory
+
+    def apply_load(self, snapshot):
+        """Replace the in-memory state with a fetched snapshot"""
+        # Ledger-wide {category: (sum, count)} as of this load, for aggregate caches
+        self.loaded_totals = snapshot["totals"]
+        # (month, {category: (sum, count)}) for this month's budget checks
+        self.loaded_period = snapshot.get("period")
+        rows = snapshot["rows"]
+        self.paged = rows is None
+        if self.paged:
+            self._set_table(ExpenseTable())
+            self._view = PagedExpenseView(self.reader, count=snapshot["count"], first_page=snapshot.get("latest"),
+                                          executor=self.executor, on_loaded=lambda view: self._notify("loaded", []))
+        else:
+            self._view = None
+            self._set_table(rows)
+        self._notify("reset", [])
+
+    def _set_table(self, table):
+        self._table = table
+        self._keys = table.sort_keys()
+        self._dates = dict(zip(table.ids, table.dates))
+
+    def load(self):
+        """Full reload from the database (startup or explicit refresh only)"""
+        self.apply_load(self.fetch(self.db))
+
+    @staticmethod
+    def insert_row(db, expense, category, comment, date):
+        """Insert an expense in ``db`` and return it as a row dict"""
+        expense_id = db.add_expense(expense, category, comment, date)
+        return {
+            "id": expense_id,
+            "expense": expense,
+            "category": category,
+            "comment": comment,
+            "date": date
+        }
+
+    @staticmethod
+    def insert_rows(db, rows):
+        """Bulk insert (expense, category, comment, date) tuples, returns row dicts"""
+        rows = list(rows)
+        ids = db.add_expenses(rows)
+        return [
+            {"id": expense_id, "expense": row[0], "category": row[1], "comment": row[2], "date": row[3]}
+            for expense_id, row in zip(ids, rows)
+        ]
+
+    @staticmethod
+    def delete_rows(db, expense_ids):
+        """Delete expenses from ``db`` in one transaction and return the rows that existed"""
+        rows = {row['id']: row for row in db.get_expenses(expense_ids)}
+        return [rows[expense_id] for expense_id in db.delete_expenses(rows) if expense_id in rows]
+
+    def apply_insert(self, rows):
+        """Record rows that were inserted in the database"""
+        if self.paged:
+            self._view.invalidate(len(self._view) + len(rows))
+        else:
+            for row in rows:
+                self._insert(row)
+        self._notify("insert", rows)
+
+    def apply_delete(self, rows):
+        """Record rows that were deleted from the database"""
+        if self.paged:
+            self._view.invalidate(len(self._view) - len(rows))
+        else:
+            rows = [row for row in rows if self._remove(row['id']) is not None]
+        if rows:
+            self._notify("delete", rows)
+        return rows
+
+    def add(self, expense, category, comment, date):
+        """Insert an expense in the database and in memory, returns the new row"""
+        row = self.insert_row(self.db, expense, category, comment, date)
+        self.apply_insert([row])
+        return row
+
+    def add_many(self, rows):
+        """Bulk insert (expense, category, comment, date) tuples, returns the new rows"""
+        inserted = self.insert_rows(self.db, rows)
+        if inserted:
+            self.apply_insert(inserted)
+        return inserted
+
+    def delete(self, expense_ids):
+        """Delete expenses by id, returns the removed rows"""
+        return self.apply_delete(self.delete_rows(self.db, expense_ids))
+
+    def _insert(self, row):
+        pos = bisect.bisect_left(self._keys, self.sort_key(row))
+        self._table.insert(pos, (row['id'], row['expense'], row['category'], row['comment'], row['date']))
+        self._dates[row['id']] = row['date']
+
+    def _position(self, expense_id):
+        """Index of an in-memory expense in the oldest-first table, or None"""
+        date = self._dates.get(expense_id)
+        if date is None:
+            return None
+        return bisect.bisect_left(self._keys, (date, expense_id))
+
+    def _remove(self, expense_id):
+        pos = self._position(expense_id)
+        if pos is None:
+            return None
+        row = self._table[pos]
+        del self._table[pos]
+        del self._dates[expense_id]
+        return row
+
+    def query(self, on_loaded=None, **filters):
+        """Paged, database-side view of the rows matching ``filters``
+
+        ``on_loaded(view)`` is called as background reads of it complete.
+        """
+        return PagedExpenseView(self.reader, executor=self.executor, on_loaded=on_loaded, **filters)
+
+    def get(self, expense_id):
+        """In-memory row by id (always None in paged mode)"""
+        pos = self._position(expense_id)
+        return None if pos is None else self._table[pos]
+
+    def index_of(self, expense_id):
+        """Position of an in-memory expense in newest-first order, or None"""
+        pos = self._position(expense_id)
+        return None if pos is None else len(self._table) - 1 - pos
+
+    def snapshot_rows(self):
+        """A copy of the in-memory rows that another thread can read while the store changes"""
+        return self._table.copy()
+
+    def sum_by_category(self):
+        """{category: total amount} over the whole ledger (vectorized over the columns in memory)"""
+        if self.paged:
+            return {category: total for category, (total, _) in self.reader.totals_by_category().items()}
+        return self._table.sum_by_category()
+
+    def __len__(self):
+        if self.paged:
+            return len(self._view)
+        return len(self._table)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self.paged:
+            return iter(self._view)
+        table = self._table
+        return (table[i] for i in range(len(table) - 1, -1, -1))
+
+    def __getitem__(self, index):
+        if self.paged:
+            return self._view[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._table)))]
+        if index < 0:
+            index += len(self._table)
+        if not 0 <= index < len(self._table):
+            raise IndexError("expense index out of range")
+        return self._table[len(self._table) - 1 - index]
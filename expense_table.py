@@ -0,0 +1,201 @@
+import sys
+from array import array
+
+from dates import month_of
+
+try:
+    import numpy as np
+except ImportError:  # Optional: every operation has a pure-Python fallback
+    np = None
+
+
+class ExpenseTable:
+    """Columnar copy of the ledger for whole-ledger analysis.
+
+    Each field is one column: ids, amounts (integer paise) and dates (epoch
+    seconds, as stored) live in ``array`` buffers, categories are stored as small
+    integer codes into ``categories`` and comments as codes into a pool of
+    interned strings, so a row costs a few dozen bytes instead of a dict.
+    Sums and group-bys run vectorized through NumPy when it is installed.
+
+    Indexing and iteration still yield row dicts, so a table can be passed
+    anywhere a list of expenses is expected; ``category_totals`` (and so
+    ``calculate_financials`` and ``generate_category_chart``) uses the
+    vectorized group-by instead of looping over them. ExpenseStore keeps its
+    in-memory ledger in one, sorted by ``sort_keys()``.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.amounts = array('q')
+        self.dates = array('q')
+        self.category_codes = array('I')
+        self.comment_codes = array('I')
+        self.categories = []
+        self.comments = []
+        self._category_index = {}
+        self._comment_index = {}
+
+    @classmethod
+    def from_db(cls, db, chunk_size=10000, ordered=False, **filters):
+        """Load the expenses matching ``filters`` straight from SQLite into columns
+
+        Rows are in id order unless ``ordered`` asks for newest first, which
+        costs a walk of the date index that aggregation does not need.
+        """
+        table = cls()
+        for chunk in db.iter_expense_chunks(chunk_size, ordered=ordered, **filters):
+            table.extend(chunk)
+        return table
+
+    @classmethod
+    def from_rows(cls, expenses):
+        """Build a table from row dicts (e.g. ``load_expenses()``)"""
+        table = cls()
+        table.extend(
+            (exp['id'], exp['expense'], exp['category'], exp['comment'], exp['date'])
+            for exp in expenses
+        )
+        return table
+
+    @staticmethod
+    def _encode(values, pool, index):
+        codes = list(map(index.get, values))
+        if None in codes:
+            # Only chunks that bring new values pay for the slow path
+            for i, value in enumerate(values):
+                if codes[i] is None:
+                    code = index.get(value)
+                    if code is None:
+                        code = index[value] = len(pool)
+                        pool.append(sys.intern(value))
+                    codes[i] = code
+        return codes
+
+    def copy(self):
+        """An independent table with the same rows"""
+        table = ExpenseTable()
+        for name in ("ids", "amounts", "dates", "category_codes", "comment_codes"):
+            setattr(table, name, array(getattr(self, name).typecode, getattr(self, name)))
+        table.categories = list(self.categories)
+        table.comments = list(self.comments)
+        table._category_index = dict(self._category_index)
+        table._comment_index = dict(self._comment_index)
+        return table
+
+    def _columns(self):
+        return (self.ids, self.amounts, self.dates, self.category_codes, self.comment_codes)
+
+    def insert(self, index, row):
+        """Insert one (id, expense, category, comment, date) tuple before ``index``"""
+        expense_id, expense, category, comment, date = row
+        self.ids.insert(index, expense_id)
+        self.amounts.insert(index, expense)
+        self.dates.insert(index, date)
+        self.category_codes.insert(index, self._encode([category], self.categories, self._category_index)[0])
+        self.comment_codes.insert(index, self._encode([comment], self.comments, self._comment_index)[0])
+
+    def __delitem__(self, index):
+        # Pooled strings stay: other rows may share them
+        for column in self._columns():
+            del column[index]
+
+    def reverse(self):
+        for column in self._columns():
+            column.reverse()
+
+    def sort_keys(self):
+        """(date, id) of each row as a read-only sequence, e.g. for bisect"""
+        return _SortKeys(self)
+
+    def extend(self, rows):
+        """Append (id, expense, category, comment, date) tuples"""
+        rows = list(rows)
+        if not rows:
+            return
+        ids, amounts, categories, comments, dates = zip(*rows)
+        self.ids.extend(ids)
+        self.amounts.extend(amounts)
+        self.dates.extend(dates)
+        self.category_codes.extend(self._encode(categories, self.categories, self._category_index))
+        self.comment_codes.extend(self._encode(comments, self.comments, self._comment_index))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __bool__(self):
+        return len(self.ids) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "id": self.ids[index],
+            "expense": self.amounts[index],
+            "category": self.categories[self.category_codes[index]],
+            "comment": self.comments[self.comment_codes[index]],
+            "date": self.dates[index]
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the columns and the string pools"""
+        size = sum(col.itemsize * len(col) for col in self._columns())
+        return size + sum(sys.getsizeof(text) for text in self.comments + self.categories)
+
+    # Aggregation
+
+    def total(self):
+        if np is not None and self.amounts:
+            return int(np.frombuffer(self.amounts, dtype=np.int64).sum())
+        return sum(self.amounts)
+
+    def sum_by_category(self):
+        """{category: total amount}, only for categories that have expenses"""
+        if not self.amounts:
+            return {}
+        if np is not None:
+            # bincount sums in float64, which is exact for totals below 2**53 paise
+            sums = np.bincount(
+                np.frombuffer(self.category_codes, dtype=np.uint32),
+                weights=np.frombuffer(self.amounts, dtype=np.int64),
+                minlength=len(self.categories)
+            )
+            counts = np.bincount(np.frombuffer(self.category_codes, dtype=np.uint32), minlength=len(self.categories))
+            return {self.categories[code]: int(round(sums[code])) for code in np.flatnonzero(counts)}
+        sums = [0] * len(self.categories)
+        seen = [False] * len(self.categories)
+        for code, amount in zip(self.category_codes, self.amounts):
+            sums[code] += amount
+            seen[code] = True
+        return {self.categories[code]: sums[code] for code in range(len(sums)) if seen[code]}
+
+    def sum_by_month(self):
+        """{"YYYY-MM": total amount}"""
+        if not self.amounts:
+            return {}
+        if np is not None:
+            months = np.frombuffer(self.dates, dtype=np.int64).astype("datetime64[s]").astype("datetime64[M]")
+            months, inverse = np.unique(months, return_inverse=True)
+            sums = np.bincount(inverse, weights=np.frombuffer(self.amounts, dtype=np.int64))
+            return {str(month): int(round(total)) for month, total in zip(np.datetime_as_string(months), sums)}
+        totals = {}
+        for date, amount in zip(self.dates, self.amounts):
+            month = month_of(date)
+            totals[month] = totals.get(month, 0) + amount
+        return {month: totals[month] for month in sorted(totals)}
+
+
+class _SortKeys:
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table.ids)
+
+    def __getitem__(self, index):
+        return (self.table.dates[index], self.table.ids[index])
@@ -0,0 +1,69 @@
+import csv
+import os
+import tempfile
+
+from dates import format_date
+from money import format_amount
+
+CSV_HEADER = ["Amount (₹)", "Category", "Comment", "Date & Time"]
+
+
+def _current_umask():
+    # os.umask can only be read by setting it, and the setting is process-wide
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once, at import on the main thread, because exports run on worker
+# threads where swapping the umask would race with other file creation
+UMASK = _current_umask()
+
+
+def new_file_mode(file_path):
+    """Permissions a plain open() would give ``file_path``: those of the file it replaces, else 0666 minus the umask"""
+    try:
+        return os.stat(file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it finishes"""
+
+
+def export_csv(db, file_path, progress=None, cancel_event=None, chunk_size=1000, **filters):
+    """Stream the expenses matching ``filters`` into a CSV file
+
+    Rows are read from a SQLite cursor a chunk at a time and written to a
+    temporary file in the target directory, which is renamed over
+    ``file_path`` only once complete. ``progress(done, total)`` is called
+    after each chunk; setting ``cancel_event`` aborts the export and leaves
+    any existing file untouched. Returns the number of rows written.
+    """
+    total = db.count_expenses(**filters)
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".export-", suffix=".csv.tmp", dir=directory)
+    count = 0
+    try:
+        with os.fdopen(fd, mode="w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_HEADER)
+            for rows in db.iter_expense_chunks(chunk_size, **filters):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ExportCancelled("Export cancelled")
+                writer.writerows(
+                    (format_amount(expense), category, comment, format_date(date))
+                    for _, expense, category, comment, date in rows
+                )
+                count += len(rows)
+                if progress:
+                    progress(count, total)
+        # mkstemp files are owner-only; keep the permissions the export would have had
+        os.chmod(temp_path, new_file_mode(file_path))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return count
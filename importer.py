@@ -0,0 +1,324 @@
+import csv
+import datetime
+import os
+import re
+from collections import Counter
+from itertools import islice
+
+from database import iter_json_array
+from dates import to_epoch
+from ledgers import ShardedLedger
+from money import to_paise
+from styles import CATEGORIES
+
+# Header names (lowercase) recognised for each field, in order of preference
+COLUMN_ALIASES = {
+    "expense": ["expense", "amount", "amount (₹)", "debit", "debit amount", "withdrawal", "withdrawal amount", "value"],
+    "category": ["category", "type", "expense type"],
+    "comment": ["comment", "description", "narration", "details", "note", "memo", "particulars", "remarks"],
+    "date": ["date", "date & time", "transaction date", "txn date", "value date", "posting date"]
+}
+
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y", "%d-%m-%y", "%d/%m/%y",
+    "%Y/%m/%d", "%d %b %Y", "%d-%b-%Y", "%d %B %Y"
+]
+
+# Keywords that map free-text bank categories or narrations onto CATEGORIES
+CATEGORY_KEYWORDS = {
+    "Food": ["food", "grocer", "restaurant", "cafe", "swiggy", "zomato", "dining", "bakery", "supermarket"],
+    "Transport": ["transport", "uber", "ola", "fuel", "petrol", "diesel", "metro", "railway", "irctc", "taxi", "parking", "toll"],
+    "Entertainment": ["entertainment", "movie", "cinema", "netflix", "spotify", "prime video", "hotstar", "game", "concert"],
+    "Shopping": ["shopping", "amazon", "flipkart", "myntra", "store", "mall", "retail"],
+    "Health": ["health", "pharma", "medical", "hospital", "clinic", "doctor", "apollo", "insurance"],
+    "Education": ["education", "school", "college", "tuition", "course", "udemy", "coursera", "book"],
+    "Utilities": ["utilit", "electric", "water", "gas", "internet", "broadband", "mobile", "recharge", "bill", "dth"]
+}
+
+AMOUNT_JUNK = re.compile(r"[₹,\s]|INR|Rs\.?", re.IGNORECASE)
+
+# One alternation over every keyword; matching at word starts so "ola" does not hit "granola"
+KEYWORD_CATEGORY = {keyword: category for category, keywords in CATEGORY_KEYWORDS.items() for keyword in keywords}
+KEYWORD_RE = re.compile(r"\b(" + "|".join(
+    re.escape(keyword) for keyword in sorted(KEYWORD_CATEGORY, key=len, reverse=True)
+) + ")")
+
+
+class ImportCancelled(Exception):
+    """Raised when an import is cancelled before it finishes"""
+
+
+class NotADebit(ValueError):
+    """Raised for statement rows with no debit amount (credits, blank debit cells)"""
+
+
+def map_columns(header, overrides=None):
+    """Map expense fields to header names, raising ValueError if amount or date is missing
+
+    ``overrides`` ({field: header name}) replaces the guess for those fields only.
+    """
+    lookup = {name.strip().lower(): name for name in header if name}
+    unknown = [name for name in (overrides or {}).values() if name not in header]
+    if unknown:
+        raise ValueError(f"No such column: {', '.join(unknown)}")
+    mapping = dict(overrides or {})
+    for field, aliases in COLUMN_ALIASES.items():
+        if field in mapping:
+            continue
+        for alias in aliases:
+            if alias in lookup:
+                mapping[field] = lookup[alias]
+                break
+    missing = [field for field in ("expense", "date") if field not in mapping]
+    if missing:
+        raise ValueError(f"Could not find a column for: {', '.join(missing)}")
+    return mapping
+
+
+class ExpenseImporter:
+    """Streaming bulk importer for bank-statement CSVs and JSON exports.
+
+    Records are read lazily, validated a batch at a time (amount, category and
+    date parsing is memoised per distinct value, which is what makes large
+    statements cheap) and mapped onto CATEGORIES. Rows that already exist in
+    the ledger are skipped by fingerprint, and each batch is inserted with a
+    single ``add_expenses`` transaction. With a ShardedLedger, rows are also
+    checked against the yearly archives the import's dates fall into.
+    """
+
+    # Past this many rows (and a quarter of the ledger) rebuilding the
+    # full-text index and rollups once beats maintaining them row by row
+    BULK_INDEX_ROWS = 20_000
+
+    def __init__(self, db, batch_size=5000, max_errors=20, ledger=None):
+        self.db = db
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._categories = {}
+        self._dates = {}
+        self._date_format = DATE_FORMATS[0]
+        self._existing = Counter()
+        self._covered = None
+        self._max_id = 0
+
+    # Parsing
+
+    def iter_records(self, file_path, columns=None):
+        """Yield raw {field: value} dicts from a CSV or JSON file"""
+        if os.path.splitext(file_path)[1].lower() == ".json":
+            with open(file_path, "r", encoding="utf-8") as file:
+                for item in iter_json_array(file):
+                    if not isinstance(item, dict):
+                        # validate_batch counts it as an invalid record
+                        yield item
+                        continue
+                    if "expense" not in item and "amount" in item:
+                        item["expense"] = item["amount"]
+                    yield item
+            return
+
+        with open(file_path, "r", newline="", encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file)
+            mapping = map_columns(reader.fieldnames or [], columns)
+            for row in reader:
+                yield {field: row.get(name) for field, name in mapping.items()}
+
+    # Validation
+
+    @staticmethod
+    def parse_amount(value):
+        """Rupee amount (number or statement text) to integer paise
+
+        Raises NotADebit for a blank, zero or negative amount, which on a
+        statement is a credit rather than a malformed row.
+        """
+        if isinstance(value, (int, float)):
+            amount = to_paise(value)
+        else:
+            text = AMOUNT_JUNK.sub("", str(value or ""))
+            if not text:
+                raise NotADebit("no debit amount")
+            if text.startswith("(") and text.endswith(")"):
+                text = "-" + text[1:-1]
+            amount = to_paise(text)
+        if amount <= 0:
+            raise NotADebit("amount must be greater than 0")
+        return amount
+
+    def map_category(self, value, comment=""):
+        """Map a free-text category (or the comment when it is unknown) onto CATEGORIES"""
+        category = None
+        if value:
+            # Bank categories repeat a lot, narrations are mostly unique
+            if value not in self._categories:
+                self._categories[value] = self._match_category(value)
+            category = self._categories[value]
+        return category or self._match_category(comment) or "Other"
+
+    @staticmethod
+    def _match_category(text):
+        if not text:
+            return None
+        text = str(text).strip().lower()
+        for category in CATEGORIES:
+            if text == category.lower():
+                return category
+        match = KEYWORD_RE.search(text)
+        return KEYWORD_CATEGORY[match.group(1)] if match else None
+
+    def parse_date(self, value):
+        """Parse a date string into the ledger's epoch seconds"""
+        value = str(value or "").strip()
+        date = self._dates.get(value)
+        if date is not None:
+            return date
+        for fmt in [self._date_format] + DATE_FORMATS:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            # Statements use one format throughout, so try the last hit first
+            self._date_format = fmt
+            date = to_epoch(parsed.replace(second=0))
+            self._dates[value] = date
+            return date
+        raise ValueError(f"unrecognised date '{value}'")
+
+    def validate_batch(self, records, first_line, errors):
+        """Turn raw records into (expense, category, comment, date) rows, collecting errors
+
+        Returns the rows and the number of non-debit records skipped.
+        """
+        rows = []
+        skipped = 0
+        for line, record in enumerate(records, start=first_line):
+            try:
+                if not isinstance(record, dict):
+                    raise TypeError(f"expected an object, got {type(record).__name__}")
+                comment = str(record.get("comment") or "").strip() or "N/A"
+                rows.append((
+                    self.parse_amount(record.get("expense")),
+                    self.map_category(record.get("category"), comment),
+                    comment,
+                    self.parse_date(record.get("date"))
+                ))
+            except NotADebit:
+                skipped += 1
+            except (TypeError, ValueError) as e:
+                if len(errors) < self.max_errors:
+                    errors.append(f"Record {line}: {str(e)}")
+        return rows, skipped
+
+    # Deduplication
+
+    @staticmethod
+    def fingerprint(expense, category, comment, date):
+        return hash((expense, category, comment, date))
+
+    def drop_duplicates(self, rows):
+        """Remove rows already present in the ledger, keeping multiplicities
+
+        Fingerprints of rows that existed before the import started are loaded
+        once per date range and consumed as matches are found, so a second
+        import of the same statement skips exactly the rows it added before.
+        """
+        if not rows:
+            return rows
+        self._cover(min(row[3] for row in rows), max(row[3] for row in rows) + 1)
+
+        fresh = []
+        existing = self._existing
+        for row in rows:
+            fp = self.fingerprint(*row)
+            if existing[fp] > 0:
+                existing[fp] -= 1
+            else:
+                fresh.append(row)
+        return fresh
+
+    def _cover(self, start, end):
+        """Load pre-import fingerprints for [start, end) not loaded yet"""
+        if self._covered is None:
+            missing = [(start, end)]
+            self._covered = (start, end)
+        else:
+            low, high = self._covered
+            missing = []
+            if start < low:
+                missing.append((start, low))
+            if end > high:
+                missing.append((high, end))
+            self._covered = (min(start, low), max(end, high))
+        for lo, hi in missing:
+            self._load_fingerprints(self.db, lo, hi)
+            if self.ledger is not None:
+                # shards_for lists the hot shard first; that is self.db
+                for db_file in self.ledger.shards_for(lo, hi)[1:]:
+                    with self.ledger.pool.reader(db_file) as archive:
+                        self._load_fingerprints(archive, lo, hi)
+
+    def _load_fingerprints(self, db, start, end):
+        for chunk in db.iter_expense_chunks(start=start, end=end, max_id=self._max_id):
+            self._existing.update(self.fingerprint(*row[1:]) for row in chunk)
+
+    # Driver
+
+    def import_file(self, file_path, columns=None, progress=None, cancel_event=None):
+        """Import a CSV or JSON file, returns a summary dict
+
+        ``progress(records_read)`` is called after each batch; setting
+        ``cancel_event`` stops before the next batch (earlier batches stay
+        committed).
+        """
+        result = {"read": 0, "imported": 0, "duplicates": 0, "skipped": 0, "invalid": 0, "errors": []}
+        # Only rows that predate the import count as duplicates
+        self._max_id = self.db.max_expense_id()
+        self._existing = Counter()
+        self._covered = None
+        ledger_size = self.db.count_expenses()
+        triggers_suspended = False
+        records = self.iter_records(file_path, columns)
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ImportCancelled("Import cancelled")
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                rows, skipped = self.validate_batch(batch, result["read"] + 1, result["errors"])
+                fresh = self.drop_duplicates(rows)
+                if not triggers_suspended and result["imported"] >= max(self.BULK_INDEX_ROWS, ledger_size // 4):
+                    self.db.suspend_triggers()
+                    triggers_suspended = True
+                self.db.add_expenses(fresh)
+                self._tally(result, batch, rows, skipped, fresh, progress)
+        finally:
+            if triggers_suspended:
+                self.db.resume_triggers()
+        return result
+
+    @staticmethod
+    def _tally(result, batch, rows, skipped, fresh, progress):
+        result["read"] += len(batch)
+        result["skipped"] += skipped
+        result["invalid"] += len(batch) - len(rows) - skipped
+        result["duplicates"] += len(rows) - len(fresh)
+        result["imported"] += len(fresh)
+        if progress:
+            progress(result["read"])
+
+
+def import_expenses(db, file_path, progress=None, cancel_event=None, columns=None, ledger=None):
+    """Convenience wrapper for running an import as a DatabaseExecutor job
+
+    ``ledger`` is the ShardedLedger of ``db``; one is opened for the import if not given.
+    """
+    if ledger is not None:
+        return ExpenseImporter(db, ledger=ledger).import_file(file_path, columns, progress, cancel_event)
+    ledger = ShardedLedger(db.db_file)
+    try:
+        return ExpenseImporter(db, ledger=ledger).import_file(file_path, columns, progress, cancel_event)
+    finally:
+        ledger.pool.close()
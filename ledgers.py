@@ -0,0 +1,419 @@
+import datetime
+import heapq
+import os
+import re
+import sqlite3
+import threading
+from contextlib import ExitStack, contextmanager
+from itertools import chain, islice
+from urllib.request import pathname2url
+
+from database import DatabaseManager, DEFAULT_PROFILE, SUMMARY_PAGE_SIZE
+from dates import from_epoch, to_epoch
+
+# SQLite attaches at most 10 databases per connection by default
+ATTACH_BATCH = 8
+ARCHIVE_FILE_RE = re.compile(r"^(\d{4})\.db$")
+# Archives are written once and then only read, so they skip WAL (which
+# needs a writable -shm file next to the database)
+ARCHIVE_PROFILE = {"journal_mode": "DELETE", "cache_size": -32000, "temp_store": "MEMORY"}
+
+
+def year_bounds(year):
+    """(start, end) epoch seconds of a calendar year, end exclusive"""
+    return to_epoch(f"{year}-01-01"), to_epoch(f"{year + 1}-01-01")
+
+
+def bucket_start(bucket):
+    """Epoch seconds where a rollup bucket ("YYYY-MM" or "YYYY-MM-DD") begins"""
+    return to_epoch(bucket if len(bucket) == 10 else bucket + "-01")
+
+
+def read_only_uri(db_file):
+    return "file:" + pathname2url(os.path.abspath(db_file)) + "?mode=ro"
+
+
+class ConnectionPool:
+    """Read-only connections shared by every ledger and shard in the process.
+
+    ``reader(db_file)`` lends a query_only DatabaseManager for that file and
+    takes it back afterwards; up to ``max_idle`` idle connections are kept
+    open, the least recently used beyond that are closed. ``attached(files)``
+    gives a connection with several files attached read-only for queries
+    that span them. Thread safe.
+    """
+
+    def __init__(self, max_idle=8, profile=DEFAULT_PROFILE):
+        self.max_idle = max_idle
+        self.profile = profile
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reader(self, db_file):
+        db_file = os.path.abspath(db_file)
+        db = None
+        with self._lock:
+            for i, (path, idle) in enumerate(self._idle):
+                if path == db_file:
+                    db = self._idle.pop(i)[1]
+                    break
+        if db is None:
+            db = DatabaseManager(db_file, read_only=True, profile=self.profile)
+        try:
+            yield db
+        finally:
+            with self._lock:
+                self._idle.append((db_file, db))
+                evicted = self._idle[:-self.max_idle] if len(self._idle) > self.max_idle else []
+                del self._idle[:len(evicted)]
+            for _, old in evicted:
+                old.close()
+
+    @contextmanager
+    def attached(self, db_files):
+        """A connection with ``db_files`` attached read-only as s0, s1, ... (at most ATTACH_BATCH)"""
+        conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+        try:
+            for i, db_file in enumerate(db_files):
+                conn.execute(f"ATTACH DATABASE ? AS s{i}", (read_only_uri(db_file),))
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, db in idle:
+            db.close()
+
+
+def attached_totals(pool, shards, key_sql, start=None, end=None, category=None):
+    """{(label, key): (total, count)} over (label, db_file) shards, grouped by ``key_sql``
+
+    Each batch of files is attached to one connection and answered by a
+    single UNION ALL query, so SQLite does the grouping for every shard.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("date < ?")
+        params.append(end)
+    if category is not None:
+        clauses.append("category = ?")
+        params.append(category)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+    totals = {}
+    for first in range(0, len(shards), ATTACH_BATCH):
+        batch = shards[first:first + ATTACH_BATCH]
+        parts, batch_params = [], []
+        for i, (label, _) in enumerate(batch):
+            parts.append(f"SELECT ? AS label, {key_sql} AS key, SUM(expense) AS total, COUNT(*) AS n "
+                         f"FROM s{i}.expenses{where} GROUP BY key")
+            batch_params += [label] + params
+        sql = f"SELECT label, key, SUM(total), SUM(n) FROM ({' UNION ALL '.join(parts)}) GROUP BY label, key"
+        with pool.attached([db_file for _, db_file in batch]) as conn:
+            for label, key, total, count in conn.execute(sql, batch_params):
+                before = totals.get((label, key), (0, 0))
+                totals[(label, key)] = (before[0] + total, before[1] + count)
+    return totals
+
+
+class ShardedLedger:
+    """One ledger split into a hot shard and read-only yearly archives.
+
+    The hot shard is the app's normal database and holds the last
+    ``hot_years`` calendar years (by default this year and last year, so
+    twelve-month trends stay in one file). Older years are moved by
+    ``archive_closed_years`` into ``<archive_dir>/<year>.db``, complete
+    ledgers of their own (rollups and search index included) that are then
+    only read. Queries pick the shards their date range overlaps: anything
+    within the hot years touches only the hot shard.
+
+    The query methods mirror DatabaseManager's read API and are thread
+    safe, so a ledger can stand in for a reader connection (the app's
+    DatabaseExecutor reads through one).
+    """
+
+    def __init__(self, hot_file, archive_dir=None, pool=None, hot_years=2, today=None):
+        self.hot_file = hot_file
+        self.archive_dir = archive_dir or os.path.splitext(hot_file)[0] + "_archive"
+        self.pool = pool or ConnectionPool()
+        self.hot_years = hot_years
+        self._today = today
+
+    def current_year(self):
+        return (self._today or datetime.date.today()).year
+
+    def archive_path(self, year):
+        return os.path.join(self.archive_dir, f"{year}.db")
+
+    def archived_years(self):
+        """Years with an archive shard, newest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        years = (ARCHIVE_FILE_RE.match(name) for name in os.listdir(self.archive_dir))
+        return sorted((int(match.group(1)) for match in years if match), reverse=True)
+
+    def shards_for(self, start=None, end=None):
+        """Database files that can hold expenses in [start, end), newest first
+
+        The hot shard is always included: it is small, and a late entry for
+        an archived year stays there until the next archive pass.
+        """
+        shards = [self.hot_file]
+        for year in self.archived_years():
+            year_start, year_end = year_bounds(year)
+            if (end is None or year_start < end) and (start is None or year_end > start):
+                shards.append(self.archive_path(year))
+        return shards
+
+    # Queries (the same signatures as DatabaseManager, so exporters and analytics accept a ledger)
+
+    def count_expenses(self, start=None, end=None, category=None, text=None):
+        total = 0
+        for db_file in self.shards_for(start, end):
+            with self.pool.reader(db_file) as db:
+                total += db.count_expenses(start, end, category, text)
+        return total
+
+    @contextmanager
+    def _merged_rows(self, chunk_size, start=None, end=None, category=None, text=None):
+        """One newest-first stream of (id, expense, category, comment, date) tuples over the shards
+
+        Each shard is read lazily, so taking the first n rows reads about n rows in total.
+        """
+        with ExitStack() as stack:
+            streams = []
+            for db_file in self.shards_for(start, end):
+                db = stack.enter_context(self.pool.reader(db_file))
+                chunks = db.iter_expense_chunks(chunk_size, start, end, category, text)
+                # Closes the cursor before the connection goes back to the pool, even if the
+                # stream is abandoned halfway (an open statement would pin an old snapshot)
+                stack.callback(chunks.close)
+                streams.append(row for chunk in chunks for row in chunk)
+            if len(streams) == 1:
+                yield streams[0]
+            else:
+                yield heapq.merge(*streams, key=lambda row: (row[4], row[0]), reverse=True)
+
+    def iter_expense_chunks(self, chunk_size=1000, start=None, end=None, category=None, text=None, ordered=True):
+        """Stream newest-first (id, expense, category, comment, date) tuples across the shards
+
+        Always ordered: ``ordered`` is accepted for DatabaseManager compatibility.
+        """
+        with self._merged_rows(chunk_size, start, end, category, text) as rows:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def query_expenses(self, start=None, end=None, category=None, text=None, limit=None, offset=0, after=None):
+        """Newest-first page of row dicts across the shards, as DatabaseManager.query_expenses
+
+        A keyset page (``after``) takes up to ``limit`` rows from each shard and
+        merges them; an offset page skips through the merged stream.
+        """
+        shards = self.shards_for(start, end)
+        if len(shards) == 1:
+            with self.pool.reader(shards[0]) as db:
+                return db.query_expenses(start, end, category, text, limit, offset, after)
+        if after is not None:
+            pages = []
+            for db_file in shards:
+                with self.pool.reader(db_file) as db:
+                    pages.append(db.query_expenses(start, end, category, text, limit, 0, after))
+            rows = heapq.merge(*pages, key=lambda row: (row['date'], row['id']), reverse=True)
+            return list(islice(rows, offset, None if limit is None else offset + limit))
+        chunk_size = 1000 if limit is None else min(offset + limit, 1000)
+        with self._merged_rows(chunk_size, start, end, category, text) as rows:
+            page = islice(rows, offset, None if limit is None else offset + limit)
+            return [DatabaseManager._row_to_dict(row) for row in page]
+
+    def load_expenses(self):
+        """Every expense as row dicts, newest first"""
+        return self.query_expenses()
+
+    def totals(self, by="category", start=None, end=None, category=None):
+        """{category or "YYYY-MM": (total, count)} across the shards, aggregated through ATTACH"""
+        key_sql = "category" if by == "category" else "strftime('%Y-%m', date, 'unixepoch')"
+        shards = [("", db_file) for db_file in self.shards_for(start, end)]
+        if len(shards) == 1:
+            with self.pool.reader(self.hot_file) as db:
+                where, params = db._filters(start, end, category)
+                rows = db.conn.execute(f"SELECT {key_sql} AS key, SUM(expense), COUNT(*) FROM expenses{where} GROUP BY key", params)
+                return {key: (total, count) for key, total, count in rows}
+        return {key: value for (_, key), value in attached_totals(self.pool, shards, key_sql, start, end, category).items()}
+
+    def totals_by_category(self):
+        """{category: (sum, count)} over the whole ledger"""
+        return self.totals("category")
+
+    def summary_snapshot(self):
+        """DatabaseManager.summary_snapshot combined over every shard, None unless each one is current
+
+        Archives are written once, so after an archive pass their snapshots
+        stay current and only the hot shard's changes.
+        """
+        snapshots = []
+        for db_file in self.shards_for():
+            with self.pool.reader(db_file) as db:
+                snapshot = db.summary_snapshot()
+            if snapshot is None:
+                return None
+            snapshots.append(snapshot)
+        if len(snapshots) == 1:
+            return snapshots[0]
+        totals = {}
+        for snapshot in snapshots:
+            for category, (total, count) in snapshot["totals"].items():
+                before = totals.get(category, (0, 0))
+                totals[category] = (before[0] + total, before[1] + count)
+        latest = chain.from_iterable(snapshot["latest"] for snapshot in snapshots)
+        return {
+            "count": sum(snapshot["count"] for snapshot in snapshots),
+            "total": sum(snapshot["total"] for snapshot in snapshots),
+            "top_category": max(totals, key=lambda category: totals[category][0]) if totals else None,
+            "totals": totals,
+            "latest": heapq.nlargest(SUMMARY_PAGE_SIZE, latest, key=lambda row: (row['date'], row['id']))
+        }
+
+    def budgets_for(self, month):
+        # Budgets live in the hot shard only
+        with self.pool.reader(self.hot_file) as db:
+            return db.budgets_for(month)
+
+    def close(self):
+        """Close the pooled connections (they reopen on the next query)"""
+        self.pool.close()
+
+    def _rollup_shards(self, start, end):
+        return self.shards_for(bucket_start(start) if start else None, bucket_start(end) if end else None)
+
+    def rollup_totals(self, period, start=None, end=None, category=None):
+        """[(bucket, total, count)] as DatabaseManager.rollup_totals, summed over the shards"""
+        merged = {}
+        for db_file in self._rollup_shards(start, end):
+            with self.pool.reader(db_file) as db:
+                for bucket, total, count in db.rollup_totals(period, start, end, category):
+                    before = merged.get(bucket, (0, 0))
+                    merged[bucket] = (before[0] + total, before[1] + count)
+        return [(bucket, total, count) for bucket, (total, count) in sorted(merged.items())]
+
+    def rollup_by_category(self, period, start=None, end=None):
+        """{category: (total, count)} as DatabaseManager.rollup_by_category, summed over the shards"""
+        merged = {}
+        for db_file in self._rollup_shards(start, end):
+            with self.pool.reader(db_file) as db:
+                for category, (total, count) in db.rollup_by_category(period, start, end).items():
+                    before = merged.get(category, (0, 0))
+                    merged[category] = (before[0] + total, before[1] + count)
+        return merged
+
+    # Archiving
+
+    def closed_years(self, db):
+        """Years before the hot window that still have expenses in the hot shard ``db``"""
+        first_hot = self.current_year() - self.hot_years + 1
+        oldest = db.conn.execute('SELECT MIN(date) FROM expenses').fetchone()[0]
+        if oldest is None:
+            return []
+        years = []
+        for year in range(from_epoch(oldest).year, first_hot):
+            if db.count_expenses(*year_bounds(year)):
+                years.append(year)
+        return years
+
+    def archive_closed_years(self, db, progress=None):
+        """Move closed years out of the hot shard ``db`` (its writer), returns the years moved"""
+        years = self.closed_years(db)
+        for year in years:
+            if progress:
+                progress(year)
+            self.archive_year(db, year)
+        return years
+
+    def archive_year(self, db, year):
+        """Copy ``year`` into its archive shard, verify it and only then delete it from the hot shard
+
+        Ids are kept, so a pass interrupted after the copy (or late entries
+        for a year archived earlier) are merged with INSERT OR IGNORE.
+        """
+        start, end = year_bounds(year)
+        path = self.archive_path(year)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        if os.path.exists(path):
+            os.chmod(path, 0o644)
+        db.conn.commit()
+        archive = DatabaseManager(path, data_file=path + ".json", profile=ARCHIVE_PROFILE)
+        try:
+            archive.conn.execute("ATTACH DATABASE ? AS hot", (read_only_uri(db.db_file),))
+            archive.suspend_triggers()
+            try:
+                with archive.conn:
+                    archive.conn.execute('''
+                        INSERT OR IGNORE INTO expenses (id, expense, category, comment, date)
+                        SELECT id, expense, category, comment, date FROM hot.expenses WHERE date >= ? AND date < ?
+                    ''', (start, end))
+            finally:
+                archive.resume_triggers()
+            missing = archive.conn.execute('''
+                SELECT COUNT(*) FROM hot.expenses AS h
+                WHERE h.date >= ? AND h.date < ? AND NOT EXISTS (
+                    SELECT 1 FROM main.expenses AS a
+                    WHERE a.id = h.id AND a.expense = h.expense AND a.category = h.category AND a.date = h.date
+                )
+            ''', (start, end)).fetchone()[0]
+            archive.conn.execute("DETACH DATABASE hot")
+            if missing:
+                raise Exception(f"Failed to archive {year}: {missing} expenses did not reach the archive")
+        finally:
+            archive.close()
+        os.chmod(path, 0o444)
+
+        with db.conn:
+            db.conn.execute('BEGIN')
+            # One rebuild of the (now small) hot rollups and search index beats per-row triggers
+            db.begin_bulk_insert()
+            db.conn.execute('DELETE FROM expenses WHERE date >= ? AND date < ?', (start, end))
+            db.end_bulk_insert()
+
+
+class LedgerSet:
+    """Named ledgers (one per household, say) under one directory, sharing a connection pool
+
+    Each ledger lives in ``<root_dir>/<name>/expenses.db`` with its archives
+    next to it; ``totals`` aggregates across all of them with ATTACH.
+    """
+
+    def __init__(self, root_dir, pool=None, hot_years=2):
+        self.root_dir = root_dir
+        self.pool = pool or ConnectionPool()
+        self.hot_years = hot_years
+
+    def names(self):
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root_dir)
+            if os.path.exists(os.path.join(self.root_dir, name, "expenses.db"))
+        )
+
+    def ledger(self, name):
+        return ShardedLedger(os.path.join(self.root_dir, name, "expenses.db"), pool=self.pool, hot_years=self.hot_years)
+
+    def totals(self, by="category", start=None, end=None, category=None):
+        """{ledger name: {category or "YYYY-MM": (total, count)}} over every ledger's shards"""
+        key_sql = "category" if by == "category" else "strftime('%Y-%m', date, 'unixepoch')"
+        shards = [(name, db_file) for name in self.names() for db_file in self.ledger(name).shards_for(start, end)]
+        totals = {name: {} for name in self.names()}
+        for (name, key), value in attached_totals(self.pool, shards, key_sql, start, end, category).items():
+            totals[name][key] = value
+        return totals
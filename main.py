@@ -1,77 +1,254 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import customtkinter as ctk
-from tkinter import filedialog, messagebox, ttk
-import csv
+import tkinter as tk
+from tkinter import filedialog, messagebox
 import datetime
+import functools
 import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import sys
+import threading
 
 # Local imports
-from database import DatabaseManager
+from database import DatabaseManager, TOTAL_BUDGET
+from expense_store import ExpenseStore, LOADING_ROW
+from virtual_tree import VirtualTreeview
+from search import SearchIndex, Debouncer
+from aggregates import ExpenseAggregates
+from db_executor import DatabaseExecutor
+from maintenance import MaintenanceScheduler
+from ledgers import ConnectionPool, ShardedLedger
+from exporter import export_csv, ExportCancelled
+from importer import import_expenses
+from theming import ThemeManager, style_treeview
 from styles import LIGHT_THEME, DARK_THEME, CATEGORIES, FONT_H1, FONT_H2, FONT_BODY, FONT_BODY_BOLD, FONT_SMALL_BOLD
-from app_logic import calculate_financials, generate_category_chart
+from money import to_paise, format_amount, format_money
+from dates import to_epoch, format_date
+from app_logic import calculate_financials, category_budget_status
+from analytics import ExpenseAnalytics
+from perf import perf, timed
+# matplotlib is only imported by the chart render thread, once the Analysis tab is first shown
+from chart_renderer import ChartRenderer
 
 # Set appearance mode and color theme
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
 
+class StartupTimer:
+    """Records startup milestones and prints them when enabled (``--startup-timing``)"""
+
+    def __init__(self, enabled=False, started=_IMPORT_STARTED):
+        self.enabled = enabled
+        self.started = started
+        self.marks = []
+        self._last = started
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.marks.append((name, now - self._last, now - self.started))
+        self._last = now
+
+    def report(self):
+        print("⏱️ Startup timing")
+        for name, step, total in self.marks:
+            print(f"  {name:<14}{step * 1000:9.1f} ms   (at {total * 1000:9.1f} ms)")
+
+
 class ExpenseTrackerApp:
-    def __init__(self, root):
+    HISTORY_TAB = "📋 History"
+    ANALYSIS_TAB = "📊 Analysis"
+    CATEGORY_CHART = "🥧 By Category"
+    TREND_CHART = "📈 Over Time"
+    BURN_DOWN_CHART = "🔥 Burn-down"
+
+    def __init__(self, root, startup_timing=False, perf_overlay=False):
         self.root = root
-        self.root.title("💸 Expense Tracker Pro")
+        self.startup = StartupTimer(startup_timing)
+        self.startup.mark("imports")
         self.root.geometry("1100x800")
         self.root.minsize(1000, 700)
         
         # Core Managers
-        self.db = DatabaseManager()
+        self.db = DatabaseManager(progress=self.show_migration_progress)
+        # Reads span the hot database and its yearly archives; writes only touch the hot one
+        self.ledger = ShardedLedger(self.db.db_file, pool=ConnectionPool(max_idle=32, profile=self.db.profile))
+        # From here on the writer connection is only used on the executor's thread
+        self.executor = DatabaseExecutor(self.db, self.root, error_handler=self.show_db_error, reader=self.ledger)
+        # Paged history reads go through the executor too, nothing is read on the Tk thread
+        self.store = ExpenseStore(self.db, reader=self.ledger, executor=self.executor)
+        # Incremented by every load_data, so results of a replaced load are ignored
+        self._load_generation = 0
+        self.startup.mark("db open")
+        # Subscribed first so the index is current before the views refresh
+        self.search_index = SearchIndex(self.store, executor=self.executor, on_loaded=self.on_rows_loaded)
+        self.aggregates = ExpenseAggregates(self.store)
+        self.store.subscribe(self.on_store_changed)
         
         # State Variables
         self.dark_mode = False
         self.current_theme = LIGHT_THEME
-        self.expenses = []
-        self.salary = 0.0
-        self.chart_canvas = None
+        self.theme = ThemeManager(self.current_theme)
+        self.theme.on_change(self.apply_theme)
+        self.status_color_key = "primary"
+        # Amounts are integer paise everywhere, formatted only for display
+        self.salary = 0
+        # {category: amount} in effect this month, TOTAL_BUDGET is the salary
+        self.budgets = {}
         self.search_var = ctk.StringVar()
-        self.search_var.trace_add("write", lambda *args: self.refresh_ui_data())
+        self.export_cancel = None
+        self._status_reset = None
+        self._perf_refresh = None
+        # Searching only touches the History table, once typing pauses
+        self.search_debouncer = Debouncer(self.root, 250, self.refresh_table)
+        self.search_var.trace_add("write", self.search_debouncer.trigger)
         
+        self.root.title("💸 Expense Tracker Pro")
+
         # Setup migrations feedback if any
-        migration_status, message = self.db.setup_database()
+        migration_status, message = self.db.migration_result
         if migration_status is True:
             messagebox.showinfo("✅ Success", message)
         elif migration_status is False:
             messagebox.showerror("❌ Migration Error", message)
 
-        self.load_data()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_ui()
+        # Idle callbacks run once the first frame has been laid out and drawn
+        self.root.after_idle(self.startup.mark, "first paint")
+        self.load_data(on_loaded=self.on_startup_loaded)
+        self.load_budgets()
+        # WAL checkpoints, PRAGMA optimize, archiving of closed years and VACUUM while nobody is typing
+        self.maintenance = MaintenanceScheduler(self.root, self.executor, ledger=self.ledger,
+                                                on_done=self.on_maintenance_done)
+        self.maintenance.start()
+        if perf_overlay:
+            self.toggle_perf_overlay()
 
-    def load_data(self):
-        """Load data from database into memory"""
-        try:
-            self.expenses = self.db.load_expenses()
-        except Exception as e:
-            messagebox.showerror("❌ Error", str(e))
-            self.expenses = []
+    def on_close(self):
+        """Let queued database writes finish, then close every connection before the window goes away"""
+        self.maintenance.stop()
+        self.chart_renderer.shutdown()
+        self.executor.shutdown(wait=True)
+        self.ledger.close()
+        self.db.close()
+        self.root.destroy()
+
+    def on_maintenance_done(self, tasks):
+        if "archive" in tasks:
+            # Rows moved between files; a load that overlapped the move may have seen them twice
+            self.load_data()
+            self.update_status("🗄️ Archived closed years")
+
+    def show_db_error(self, error):
+        messagebox.showerror("❌ Database Error", str(error))
+
+    def show_migration_progress(self, count):
+        """Report legacy JSON import progress before the main UI exists"""
+        self.root.title(f"💸 Expense Tracker Pro - importing expenses ({count:,})")
+        self.root.update_idletasks()
+
+    def load_data(self, on_loaded=None):
+        """Reload from the database in the background
+
+        Totals and the first page of history come first, from the persisted
+        summary snapshot when it is current (else straight from SQLite); the
+        full in-memory ledger follows in a second read, which also checks the
+        snapshot.
+        """
+        self._load_generation += 1
+        self.read_for_load(lambda snapshot: self.on_summary_loaded(snapshot, on_loaded), self.store.fetch_persisted)
+
+    def read_for_load(self, on_fetched, fetch, *args, generation=None):
+        """Run a store fetch on a reader and hand its result to ``on_fetched`` on the Tk thread
+
+        Reads race with the writer: a write submitted or applied while the
+        fetch ran may or may not be in its result, and applying it would
+        drop or double that write in memory. Such a result is read again
+        instead, and no read starts while writes are still running. Results
+        of a load that a newer load_data replaced are dropped.
+        """
+        if generation is None:
+            generation = self._load_generation
+        if generation != self._load_generation:
+            return
+        if self.store.writes_pending():
+            self.root.after(50, lambda: self.read_for_load(on_fetched, fetch, *args, generation=generation))
+            return
+        epoch = self.store.write_epoch
+
+        def deliver(snapshot):
+            if generation != self._load_generation:
+                return
+            if not self.store.unchanged_since(epoch):
+                self.read_for_load(on_fetched, fetch, *args, generation=generation)
+                return
+            on_fetched(snapshot)
+
+        self.executor.read(fetch, *args, on_done=deliver, on_error=lambda e: messagebox.showerror("❌ Error", str(e)))
+
+    def on_summary_loaded(self, snapshot, on_loaded):
+        self.store.apply_load(snapshot)
+        self.startup.mark("summary")
+        if not self.store.fits_in_memory(snapshot["count"]):
+            # Too big to hold in memory, the paged view is the final state
+            if snapshot["persisted"]:
+                self.read_for_load(lambda fresh: self.check_summary(snapshot, fresh), self.store.fetch, True)
+            else:
+                self.check_summary(snapshot, None)
+            if on_loaded:
+                on_loaded()
+            return
+
+        def apply_rows(fresh):
+            self.store.apply_load(fresh)
+            self.check_summary(snapshot, fresh)
+            if on_loaded:
+                on_loaded()
+
+        self.read_for_load(apply_rows, self.store.fetch)
+
+    def check_summary(self, shown, fresh):
+        """Rebuild the persisted summary snapshot in the background unless ``shown`` matched the table
+
+        ``fresh`` is a later fetch; a paged store is corrected with it when
+        the persisted numbers turn out to be off.
+        """
+        if shown["persisted"] and shown["count"] == fresh["count"] and shown["totals"] == fresh["totals"]:
+            return
+        if fresh is not None and self.store.paged:
+            self.store.apply_load(fresh)
+        # A stale snapshot only costs the next start its head start, nothing to report
+        self.executor.write(DatabaseManager.rebuild_summary_snapshot, on_error=lambda e: None)
+
+    def on_startup_loaded(self):
+        self.startup.mark("fully loaded")
+        if self.startup.enabled:
+            self.startup.report()
+            self.on_close()
 
     def create_ui(self):
         """Create the main user interface"""
         # Main container
-        self.main_container = ctk.CTkFrame(self.root, fg_color=self.current_theme["bg"])
+        self.main_container = self.theme.register(ctk.CTkFrame(self.root), fg_color="bg")
         self.main_container.pack(fill="both", expand=True)
         
         # Header
         self.create_header(self.main_container)
         
         # Content area with scrollable content or grid
-        content_frame = ctk.CTkFrame(self.main_container, fg_color=self.current_theme["bg"])
+        content_frame = self.theme.register(ctk.CTkFrame(self.main_container), fg_color="bg")
         content_frame.pack(fill="both", expand=True, padx=15, pady=15)
         
         # Left column (Entry & Summary)
-        left_column = ctk.CTkFrame(content_frame, fg_color=self.current_theme["bg"], width=350)
+        left_column = self.theme.register(ctk.CTkFrame(content_frame, width=350), fg_color="bg")
         left_column.pack(side="left", fill="both", expand=False, padx=(0, 10))
         left_column.pack_propagate(False)
         
         # Right column (History & Analysis)
-        right_column = ctk.CTkFrame(content_frame, fg_color=self.current_theme["bg"])
+        right_column = self.theme.register(ctk.CTkFrame(content_frame), fg_color="bg")
         right_column.pack(side="left", fill="both", expand=True, padx=(10, 0))
         
         # Add sections to left column
@@ -80,11 +257,15 @@ class ExpenseTrackerApp:
         self.create_summary_panel(left_column)
         
         # Add sections to right column
-        right_tabs = ctk.CTkTabview(right_column, fg_color=self.current_theme["card"], segmented_button_selected_color=self.current_theme["primary"])
-        right_tabs.pack(fill="both", expand=True)
+        self.right_tabs = self.theme.register(
+            ctk.CTkTabview(right_column, command=self.on_tab_changed),
+            fg_color="card",
+            segmented_button_selected_color="primary"
+        )
+        self.right_tabs.pack(fill="both", expand=True)
         
-        self.tab_history = right_tabs.add("📋 History")
-        self.tab_analysis = right_tabs.add("📊 Analysis")
+        self.tab_history = self.right_tabs.add(self.HISTORY_TAB)
+        self.tab_analysis = self.right_tabs.add(self.ANALYSIS_TAB)
         
         self.create_expense_log(self.tab_history)
         self.create_analysis_tab(self.tab_analysis)
@@ -97,7 +278,7 @@ class ExpenseTrackerApp:
 
     def create_header(self, parent):
         """Create modern header with theme toggle"""
-        header = ctk.CTkFrame(parent, fg_color=self.current_theme["primary"], height=80)
+        header = self.theme.register(ctk.CTkFrame(parent, height=80), fg_color="primary")
         header.pack(fill="x", padx=0, pady=0)
         header.pack_propagate(False)
         
@@ -110,7 +291,7 @@ class ExpenseTrackerApp:
         
         # Theme toggle
         btn_text = "☀️ Light Mode" if self.dark_mode else "🌙 Dark Mode"
-        toggle_btn = ctk.CTkButton(
+        self.theme_toggle_btn = ctk.CTkButton(
             header,
             text=btn_text,
             font=FONT_SMALL_BOLD,
@@ -120,90 +301,106 @@ class ExpenseTrackerApp:
             fg_color="#2980b9",
             hover_color="#1f618d"
         )
-        toggle_btn.pack(side="right", padx=20)
+        self.theme_toggle_btn.pack(side="right", padx=20)
 
     def create_expense_entry(self, parent):
         """Create expense entry card"""
-        card = ctk.CTkFrame(parent, fg_color=self.current_theme["card"], corner_radius=10)
+        card = self.theme.register(ctk.CTkFrame(parent, corner_radius=10), fg_color="card")
         card.pack(fill="x", pady=(0, 10))
         
-        ctk.CTkLabel(card, text="📝 Add New Expense", font=FONT_H2, text_color=self.current_theme["primary"]).pack(anchor="w", padx=15, pady=(15, 10))
+        self.theme.register(ctk.CTkLabel(card, text="📝 Add New Expense", font=FONT_H2), text_color="primary").pack(anchor="w", padx=15, pady=(15, 10))
         
         # Amount
-        ctk.CTkLabel(card, text="Amount (₹)", font=FONT_SMALL_BOLD, text_color=self.current_theme["text"]).pack(anchor="w", padx=15)
+        self.theme.register(ctk.CTkLabel(card, text="Amount (₹)", font=FONT_SMALL_BOLD), text_color="text").pack(anchor="w", padx=15)
         self.expense_entry = ctk.CTkEntry(card, placeholder_text="Enter amount", height=35)
         self.expense_entry.pack(fill="x", padx=15, pady=(0, 10))
         
         # Category
-        ctk.CTkLabel(card, text="Category", font=FONT_SMALL_BOLD, text_color=self.current_theme["text"]).pack(anchor="w", padx=15)
+        self.theme.register(ctk.CTkLabel(card, text="Category", font=FONT_SMALL_BOLD), text_color="text").pack(anchor="w", padx=15)
         self.category_combo = ctk.CTkComboBox(card, values=CATEGORIES, height=35, state="readonly")
         self.category_combo.pack(fill="x", padx=15, pady=(0, 10))
         self.category_combo.set(CATEGORIES[0])
         
         # Comment
-        ctk.CTkLabel(card, text="Comment (Optional)", font=FONT_SMALL_BOLD, text_color=self.current_theme["text"]).pack(anchor="w", padx=15)
+        self.theme.register(ctk.CTkLabel(card, text="Comment (Optional)", font=FONT_SMALL_BOLD), text_color="text").pack(anchor="w", padx=15)
         self.comment_entry = ctk.CTkEntry(card, placeholder_text="Add a note...", height=35)
         self.comment_entry.pack(fill="x", padx=15, pady=(0, 10))
         
         # Add button
-        ctk.CTkButton(
+        self.theme.register(ctk.CTkButton(
             card,
             text="➕ Add Expense",
             font=FONT_BODY_BOLD,
             height=40,
             command=self.add_expense,
-            fg_color=self.current_theme["secondary"],
             hover_color="#27ae60"
-        ).pack(fill="x", padx=15, pady=15)
+        ), fg_color="secondary").pack(fill="x", padx=15, pady=15)
 
     def create_salary_section(self, parent):
         """Create salary entry card"""
-        card = ctk.CTkFrame(parent, fg_color=self.current_theme["card"], corner_radius=10)
+        card = self.theme.register(ctk.CTkFrame(parent, corner_radius=10), fg_color="card")
         card.pack(fill="x", pady=10)
         
-        ctk.CTkLabel(card, text="💰 Salary Information", font=FONT_H2, text_color=self.current_theme["primary"]).pack(anchor="w", padx=15, pady=(15, 10))
+        self.theme.register(ctk.CTkLabel(card, text="💰 Salary Information", font=FONT_H2), text_color="primary").pack(anchor="w", padx=15, pady=(15, 10))
         
         self.salary_entry = ctk.CTkEntry(card, placeholder_text="Enter monthly salary", height=35)
         self.salary_entry.pack(fill="x", padx=15, pady=(0, 10))
         
-        ctk.CTkButton(
-            card,
+        buttons = ctk.CTkFrame(card, fg_color="transparent")
+        buttons.pack(fill="x", padx=15, pady=15)
+
+        self.theme.register(ctk.CTkButton(
+            buttons,
             text="📊 Update Balance",
             font=FONT_BODY_BOLD,
             height=35,
-            command=self.refresh_ui_data,
-            fg_color=self.current_theme["primary"]
-        ).pack(fill="x", padx=15, pady=15)
+            command=self.save_salary
+        ), fg_color="primary").pack(side="left", fill="x", expand=True, padx=(0, 5))
+
+        self.theme.register(ctk.CTkButton(
+            buttons,
+            text="🎯 Limits",
+            font=FONT_BODY_BOLD,
+            width=90,
+            height=35,
+            command=self.edit_category_limits
+        ), fg_color="warning").pack(side="left", padx=(5, 0))
 
     def create_summary_panel(self, parent):
         """Create summary statistics panel"""
-        card = ctk.CTkFrame(parent, fg_color=self.current_theme["card"], corner_radius=10)
+        card = self.theme.register(ctk.CTkFrame(parent, corner_radius=10), fg_color="card")
         card.pack(fill="both", expand=True, pady=10)
         
-        ctk.CTkLabel(card, text="📈 Financial Summary", font=FONT_H2, text_color=self.current_theme["primary"]).pack(anchor="w", padx=15, pady=(15, 10))
+        self.theme.register(ctk.CTkLabel(card, text="📈 Financial Summary", font=FONT_H2), text_color="primary").pack(anchor="w", padx=15, pady=(15, 10))
         
-        self.total_label = ctk.CTkLabel(card, text="💷 Total Spent: ₹0.00", font=FONT_BODY_BOLD, text_color=self.current_theme["text"])
+        self.total_label = self.theme.register(ctk.CTkLabel(card, text="💷 Spent This Month: ₹0.00", font=FONT_BODY_BOLD), text_color="text")
         self.total_label.pack(anchor="w", padx=20, pady=5)
         
-        self.remaining_label = ctk.CTkLabel(card, text="💰 Remaining: N/A", font=FONT_BODY_BOLD, text_color=self.current_theme["text"])
+        self.remaining_label = self.theme.register(ctk.CTkLabel(card, text="💰 Remaining: N/A", font=FONT_BODY_BOLD), text_color="text")
         self.remaining_label.pack(anchor="w", padx=20, pady=5)
         
-        self.percentage_label = ctk.CTkLabel(card, text="📊 Spent: 0%", font=FONT_BODY_BOLD, text_color=self.current_theme["text"])
+        self.percentage_label = self.theme.register(ctk.CTkLabel(card, text="📊 Spent: 0%", font=FONT_BODY_BOLD), text_color="text")
         self.percentage_label.pack(anchor="w", padx=20, pady=5)
         
-        self.status_label = ctk.CTkLabel(card, text="ℹ️ Enter salary", font=FONT_BODY_BOLD, text_color=self.current_theme["primary"])
+        # Colored by financial status in refresh_summary, not registered
+        self.status_label = ctk.CTkLabel(card, text="ℹ️ Enter salary", font=FONT_BODY_BOLD, text_color=self.theme["primary"])
         self.status_label.pack(anchor="w", padx=20, pady=5)
         
-        self.top_category_label = ctk.CTkLabel(card, text="🏆 Top Category: N/A", font=FONT_BODY_BOLD, text_color=self.current_theme["text"])
+        self.top_category_label = self.theme.register(ctk.CTkLabel(card, text="🏆 Top Category: N/A", font=FONT_BODY_BOLD), text_color="text")
         self.top_category_label.pack(anchor="w", padx=20, pady=5)
 
+        self.limits_label = self.theme.register(
+            ctk.CTkLabel(card, text="🎯 No category limits set", font=FONT_BODY_BOLD, justify="left"), text_color="text"
+        )
+        self.limits_label.pack(anchor="w", padx=20, pady=5)
+
     def create_expense_log(self, parent):
         """Create expense history table"""
         # Search Frame
         search_frame = ctk.CTkFrame(parent, fg_color="transparent")
         search_frame.pack(fill="x", padx=10, pady=(5, 0))
         
-        ctk.CTkLabel(search_frame, text="🔍 Search:", font=FONT_SMALL_BOLD, text_color=self.current_theme["text"]).pack(side="left", padx=(0, 5))
+        self.theme.register(ctk.CTkLabel(search_frame, text="🔍 Search:", font=FONT_SMALL_BOLD), text_color="text").pack(side="left", padx=(0, 5))
         
         self.search_entry = ctk.CTkEntry(
             search_frame, 
@@ -213,42 +410,30 @@ class ExpenseTrackerApp:
         )
         self.search_entry.pack(side="left", fill="x", expand=True)
         
-        ctk.CTkButton(
+        self.theme.register(ctk.CTkButton(
             search_frame,
             text="❌",
             width=30,
             height=30,
             command=self.clear_search,
-            fg_color="transparent",
-            hover_color=self.current_theme["bg"],
-            text_color=self.current_theme["text"]
-        ).pack(side="left", padx=(5, 0))
+            fg_color="transparent"
+        ), hover_color="bg", text_color="text").pack(side="left", padx=(5, 0))
 
         # Treeview frame
         tree_frame = ctk.CTkFrame(parent, fg_color="transparent")
         tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Style for Treeview
-        style = ttk.Style()
-        style.theme_use('clam')
-        
-        bg_color = self.current_theme["card"]
-        fg_color = self.current_theme["text"]
-        
-        style.configure('Treeview', 
-                        background=bg_color, 
-                        foreground=fg_color, 
-                        fieldbackground=bg_color,
-                        rowheight=30,
-                        font=FONT_BODY)
-        style.configure('Treeview.Heading', font=FONT_SMALL_BOLD, background=self.current_theme["primary"], foreground="white")
-        style.map('Treeview', background=[('selected', self.current_theme["primary"])])
+        # Style for Treeview (restyled in place by apply_theme)
+        style_treeview(self.theme.theme)
         
-        self.tree = ttk.Treeview(
+        self.history = VirtualTreeview(
             tree_frame,
             columns=("Amount", "Category", "Comment", "Date"),
+            row_values=self.row_values,
+            row_id=lambda exp: exp['id'],
             show="headings"
         )
+        self.tree = self.history.tree
         
         self.tree.heading("Amount", text="Amount (₹)")
         self.tree.heading("Category", text="Category")
@@ -260,147 +445,436 @@ class ExpenseTrackerApp:
         self.tree.column("Comment", width=250, anchor="w")
         self.tree.column("Date", width=150, anchor="center")
         
-        # Add hidden Column for ID
-        self.tree["columns"] = ("Amount", "Category", "Comment", "Date", "ID")
-        self.tree.column("ID", width=0, stretch=False)
-        self.tree["displaycolumns"] = ("Amount", "Category", "Comment", "Date")
-        
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        
-        self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.history.pack()
         
         button_frame = ctk.CTkFrame(parent, fg_color="transparent")
         button_frame.pack(fill="x", padx=15, pady=15)
 
-        ctk.CTkButton(
+        self.theme.register(ctk.CTkButton(
             button_frame,
             text="🗑️ Delete Selected Expense",
             font=FONT_BODY_BOLD,
             height=35,
             command=self.delete_expense,
-            fg_color=self.current_theme["danger"],
             hover_color="#c0392b"
-        ).pack(side="left", fill="x", expand=True, padx=(0, 7))
+        ), fg_color="danger").pack(side="left", fill="x", expand=True, padx=(0, 7))
 
-        ctk.CTkButton(
+        self.theme.register(ctk.CTkButton(
             button_frame,
             text="⬇️ Export to CSV",
             font=FONT_BODY_BOLD,
             height=35,
             command=self.export_to_csv,
-            fg_color=self.current_theme["secondary"],
             hover_color="#27ae60"
-        ).pack(side="left", fill="x", expand=True, padx=(7, 0))
+        ), fg_color="secondary").pack(side="left", fill="x", expand=True, padx=7)
+
+        self.theme.register(ctk.CTkButton(
+            button_frame,
+            text="⬆️ Import",
+            font=FONT_BODY_BOLD,
+            height=35,
+            command=self.import_from_file
+        ), fg_color="primary").pack(side="left", fill="x", expand=True, padx=(7, 0))
 
     def create_analysis_tab(self, parent):
         """Create the analysis tab with charts"""
         self.analysis_frame = ctk.CTkFrame(parent, fg_color="transparent")
         self.analysis_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        self.chart_label = ctk.CTkLabel(self.analysis_frame, text="Expense Distribution", font=FONT_H2, text_color=self.current_theme["primary"])
+        self.chart_label = self.theme.register(ctk.CTkLabel(self.analysis_frame, text="Expense Distribution", font=FONT_H2), text_color="primary")
         self.chart_label.pack(pady=(0, 10))
+
+        self.chart_selector = self.theme.register(ctk.CTkSegmentedButton(
+            self.analysis_frame,
+            values=[self.CATEGORY_CHART, self.TREND_CHART, self.BURN_DOWN_CHART],
+            font=FONT_SMALL_BOLD,
+            command=lambda _: self.update_chart()
+        ), selected_color="primary")
+        self.chart_selector.set(self.CATEGORY_CHART)
+        self.chart_selector.pack(pady=(0, 10))
         
-        self.chart_container = ctk.CTkFrame(self.analysis_frame, fg_color=self.current_theme["card"], corner_radius=10)
+        self.theme.register(ctk.CTkButton(
+            self.analysis_frame,
+            text="🖼️ Save Chart",
+            font=FONT_BODY_BOLD,
+            height=35,
+            command=self.save_chart_image
+        ), fg_color="primary").pack(side="bottom", fill="x", pady=(10, 0))
+
+        self.chart_container = self.theme.register(ctk.CTkFrame(self.analysis_frame, corner_radius=10), fg_color="card")
         self.chart_container.pack(fill="both", expand=True)
+        # The rendered image is sized to the container, not the other way round
+        self.chart_container.pack_propagate(False)
         
         self.no_data_label = ctk.CTkLabel(self.chart_container, text="No expense data to analyze.\nAdd some expenses first!", font=FONT_BODY)
         self.no_data_label.pack(expand=True)
+        self.chart_image_label = self.theme.register(tk.Label(self.chart_container, bd=0, highlightthickness=0), bg="card")
+
+        # Charts are drawn to images on a render thread and cached by data, theme and size
+        self.chart_renderer = ChartRenderer()
+        self.chart_image = None
+        self.chart_photo = None
+        self._chart_token = 0
+        self.chart_dirty = True
+        self.chart_resize_debouncer = Debouncer(self.root, 200, self.on_chart_resized)
+        self.chart_container.bind("<Configure>", lambda event: self.chart_resize_debouncer.trigger(), add="+")
 
     def create_status_bar(self, parent):
         """Create status bar at bottom"""
-        status_frame = ctk.CTkFrame(parent, fg_color=self.current_theme["primary"], height=30)
+        status_frame = self.theme.register(ctk.CTkFrame(parent, height=30), fg_color="primary")
         status_frame.pack(fill="x")
         status_frame.pack_propagate(False)
         
         self.status_message = ctk.CTkLabel(status_frame, text="✅ Ready", font=FONT_SMALL_BOLD, text_color="white")
-        self.status_message.pack(anchor="w", padx=20, pady=5)
+        self.status_message.pack(side="left", padx=20, pady=5)
 
-    def update_status(self, message, duration=3000):
+        # Timing overlay: p50/p95 of the slowest hot paths, recorded only while shown
+        self.perf_toggle_btn = ctk.CTkButton(
+            status_frame, text="⏱️", font=FONT_SMALL_BOLD, width=30, height=22,
+            command=self.toggle_perf_overlay, fg_color="transparent", text_color="white"
+        )
+        self.perf_toggle_btn.pack(side="right", padx=(0, 10))
+        self.perf_dump_btn = ctk.CTkButton(
+            status_frame, text="💾", font=FONT_SMALL_BOLD, width=30, height=22,
+            command=self.dump_perf, fg_color="transparent", text_color="white"
+        )
+        self.perf_label = ctk.CTkLabel(status_frame, text="", font=FONT_SMALL_BOLD, text_color="white")
+
+        # Only shown while an export is running
+        self.cancel_export_btn = ctk.CTkButton(
+            status_frame,
+            text="✖ Cancel",
+            font=FONT_SMALL_BOLD,
+            width=80,
+            height=22,
+            command=self.cancel_export,
+            fg_color="transparent",
+            border_width=1,
+            border_color="white",
+            text_color="white"
+        )
+
+    def set_status(self, message):
+        """Show a status message that stays until replaced"""
+        if self._status_reset is not None:
+            self.root.after_cancel(self._status_reset)
+            self._status_reset = None
         self.status_message.configure(text=message)
-        self.root.after(duration, lambda: self.status_message.configure(text="✅ Ready"))
+
+    def update_status(self, message, duration=3000):
+        self.set_status(message)
+        self._status_reset = self.root.after(duration, lambda: self.set_status("✅ Ready"))
+
+    def toggle_perf_overlay(self):
+        """Start or stop recording hot-path timings and showing them in the status bar"""
+        perf.enabled = not perf.enabled
+        if perf.enabled:
+            self.perf_dump_btn.pack(side="right", after=self.perf_toggle_btn)
+            self.perf_label.pack(side="right", padx=10, after=self.perf_dump_btn)
+            self.refresh_perf_overlay()
+        else:
+            if self._perf_refresh is not None:
+                self.root.after_cancel(self._perf_refresh)
+                self._perf_refresh = None
+            self.perf_label.pack_forget()
+            self.perf_dump_btn.pack_forget()
+
+    def refresh_perf_overlay(self):
+        self.perf_label.configure(text=f"⏱️ {perf.summary()}")
+        self._perf_refresh = self.root.after(1000, self.refresh_perf_overlay)
+
+    def dump_perf(self):
+        """Save the recorded timings as JSON"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            initialfile="perf_timings.json",
+            title="Save timings"
+        )
+        if not file_path:
+            return
+        try:
+            perf.dump(file_path)
+            self.update_status(f"✅ Timings saved to {os.path.basename(file_path)}")
+        except Exception as e:
+            messagebox.showerror("❌ Error", f"Unable to save timings: {str(e)}")
 
     def toggle_theme(self):
-        """Toggle between dark and light mode"""
+        """Toggle between dark and light mode, recoloring the existing widgets"""
         self.dark_mode = not self.dark_mode
         ctk.set_appearance_mode("dark" if self.dark_mode else "light")
         self.current_theme = DARK_THEME if self.dark_mode else LIGHT_THEME
-        
-        # Save color selection if we had persistent settings (placeholder)
-        
-        # Hard refresh UI
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self.create_ui()
+        self.theme.apply(self.current_theme)
         self.update_status(f"✅ {'Dark' if self.dark_mode else 'Light'} mode enabled")
 
+    def apply_theme(self, theme):
+        """Restyle what the widget registry cannot: ttk styles, status colors and the chart"""
+        style_treeview(theme)
+        self.status_label.configure(text_color=theme[self.status_color_key])
+        self.theme_toggle_btn.configure(text="☀️ Light Mode" if self.dark_mode else "🌙 Dark Mode")
+        # Same figure and canvas, only the colors change (drawn once the tab is visible)
+        self.update_chart()
+
+    @timed("ui.refresh_ui_data")
     def refresh_ui_data(self):
         """Refresh all labels, table and charts"""
-        # Load from entry
-        salary_str = self.salary_entry.get().strip()
-        try:
-            self.salary = float(salary_str) if salary_str else 0.0
-        except ValueError:
-            messagebox.showwarning("⚠️ Warning", "Please enter a valid salary number.")
-            self.salary = 0.0
-            
-        # Update labels
-        metrics = calculate_financials(self.expenses, self.salary)
+        self.refresh_summary()
+        self.refresh_table()
+        self.update_chart()
+
+    @timed("ui.refresh_summary")
+    def refresh_summary(self):
+        """Refresh the financial summary labels from this month's running totals"""
+        if self.aggregates.check_period():
+            # New month: budgets may have changed too, and the reload reseeds this month's totals
+            self.load_budgets()
+            self.load_data()
+        metrics = calculate_financials(self.store, self.salary, self.aggregates.period_by_category)
         
-        self.total_label.configure(text=f"💷 Total Spent: ₹{metrics['total']:.2f}")
+        self.total_label.configure(text=f"💷 Spent This Month: {format_money(metrics['total'])}")
         
         if self.salary > 0:
-            self.remaining_label.configure(text=f"💰 Remaining: ₹{metrics['remaining']:.2f}")
+            self.remaining_label.configure(text=f"💰 Remaining: {format_money(metrics['remaining'])}")
             self.percentage_label.configure(text=f"📊 Spent: {metrics['percentage']:.1f}%")
         else:
             self.remaining_label.configure(text="💰 Remaining: N/A")
             self.percentage_label.configure(text="📊 Spent: 0%")
             
         # Status styling
-        status_color = self.current_theme["primary"]
-        if metrics["status_type"] == "danger": status_color = self.current_theme["danger"]
-        elif metrics["status_type"] == "warning": status_color = self.current_theme["warning"]
-        elif metrics["status_type"] == "success": status_color = self.current_theme["secondary"]
+        self.status_color_key = "primary"
+        if metrics["status_type"] == "danger": self.status_color_key = "danger"
+        elif metrics["status_type"] == "warning": self.status_color_key = "warning"
+        elif metrics["status_type"] == "success": self.status_color_key = "secondary"
         
-        self.status_label.configure(text=metrics["status"], text_color=status_color)
+        self.status_label.configure(text=metrics["status"], text_color=self.theme[self.status_color_key])
         self.top_category_label.configure(text=f"🏆 Top Category: {metrics['top_category']}")
-        
-        # Refresh Table
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        search_term = self.search_var.get().lower()
-        
-        for exp in self.expenses:
-            # Filter logic: Match Comment or Category
-            match_comment = search_term in exp['comment'].lower()
-            match_category = search_term in exp['category'].lower()
-            
-            if not search_term or match_comment or match_category:
-                self.tree.insert("", "end", values=(f"₹{exp['expense']:.2f}", exp['category'], exp['comment'], exp['date'], exp['id']))
-            
-        # Refresh Chart
+
+        limits = {cat: amount for cat, amount in self.budgets.items() if cat != TOTAL_BUDGET}
+        statuses = category_budget_status(self.aggregates.period_by_category, limits)
+        if not statuses:
+            self.limits_label.configure(text="🎯 No category limits set")
+        else:
+            icons = {"danger": "🔴", "warning": "🟠", "success": "🟢"}
+            lines = [f"{icons[s['status_type']]} {s['category']}: {s['percent']:.0f}% of {format_money(s['limit'])}" for s in statuses[:3]]
+            self.limits_label.configure(text="🎯 " + "\n    ".join(lines))
+
+    def load_budgets(self):
+        """Read this month's budgets in the background"""
+        month = datetime.date.today().strftime("%Y-%m")
+        self.executor.read(lambda db: db.budgets_for(month), on_done=self.on_budgets_loaded)
+
+    def on_budgets_loaded(self, budgets):
+        self.budgets = budgets
+        self.salary = budgets.get(TOTAL_BUDGET, 0)
+        self.salary_entry.delete(0, "end")
+        if self.salary:
+            self.salary_entry.insert(0, format_amount(self.salary))
+        self.refresh_summary()
         self.update_chart()
 
+    def save_budgets(self, budgets, message):
+        """Store budgets from this month on and refresh the summary"""
+        month = datetime.date.today().strftime("%Y-%m")
+
+        def saved(result):
+            self.on_budgets_loaded(result)
+            self.update_status(message)
+
+        self.executor.write(lambda db: db.set_budgets(month, budgets), on_done=saved)
+
+    def save_salary(self):
+        salary_str = self.salary_entry.get().strip()
+        try:
+            salary = to_paise(salary_str) if salary_str else 0
+            if salary < 0: raise ValueError
+        except ValueError:
+            messagebox.showwarning("⚠️ Warning", "Please enter a valid salary number.")
+            return
+        self.save_budgets({TOTAL_BUDGET: salary}, "✅ Monthly budget saved")
+
+    def edit_category_limits(self):
+        """Dialog for this month's per-category spending limits"""
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Category Limits")
+        dialog.geometry("320x440")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+
+        ctk.CTkLabel(dialog, text="🎯 Monthly limit per category", font=FONT_H2).pack(anchor="w", padx=20, pady=(15, 10))
+        entries = {}
+        for cat in CATEGORIES:
+            row = ctk.CTkFrame(dialog, fg_color="transparent")
+            row.pack(fill="x", padx=20, pady=2)
+            ctk.CTkLabel(row, text=cat, font=FONT_SMALL_BOLD, width=110, anchor="w").pack(side="left")
+            entry = ctk.CTkEntry(row, placeholder_text="No limit", width=150)
+            entry.pack(side="left")
+            if self.budgets.get(cat):
+                entry.insert(0, format_amount(self.budgets[cat]))
+            entries[cat] = entry
+
+        def confirm():
+            limits = {}
+            for cat, entry in entries.items():
+                text = entry.get().strip()
+                try:
+                    limits[cat] = to_paise(text) if text else 0
+                    if limits[cat] < 0: raise ValueError
+                except ValueError:
+                    messagebox.showwarning("⚠️ Input Error", f"Please enter a valid limit for {cat}.", parent=dialog)
+                    return
+            dialog.destroy()
+            self.save_budgets(limits, "✅ Category limits saved")
+
+        ctk.CTkButton(dialog, text="💾 Save", font=FONT_BODY_BOLD, command=confirm,
+                      fg_color=self.current_theme["secondary"], hover_color="#27ae60").pack(fill="x", padx=20, pady=(15, 5))
+        dialog.grab_set()
+
+    @timed("ui.refresh_table")
+    def refresh_table(self):
+        """Point the history table at the rows matching the current search"""
+        self.history.set_source(self.search_index.search(self.search_var.get()))
+
+    def row_values(self, exp):
+        if exp is LOADING_ROW:
+            return ("", "", exp['comment'], "")
+        return (format_money(exp['expense']), exp['category'], exp['comment'], format_date(exp['date']))
+
+    def on_rows_loaded(self, view):
+        """Redraw the history table when rows it is showing arrive from a background read"""
+        if hasattr(self, "history") and self.history.source is view:
+            self.history.refresh()
+
+    @timed("ui.on_store_changed")
+    def on_store_changed(self, event, rows):
+        """Apply store changes to the views without reloading the ledger"""
+        if not hasattr(self, "history"):
+            return
+        if event == "loaded":
+            self.on_rows_loaded(self.store)
+            return
+        if event == "reset" or self.search_var.get():
+            self.refresh_table()
+        else:
+            # The store is the table's source, only the viewport needs redrawing
+            if event == "delete":
+                self.history.forget(exp['id'] for exp in rows)
+            self.history.refresh()
+        self.refresh_summary()
+        self.update_chart()
+
+    def on_tab_changed(self):
+        """Draw a chart update that was deferred while the tab was hidden"""
+        if self.chart_dirty and self.right_tabs.get() == self.ANALYSIS_TAB:
+            self.update_chart()
+
+    @timed("ui.update_chart")
     def update_chart(self):
-        """Update the matplotlib chart in the analysis tab"""
-        if self.chart_canvas:
-            self.chart_canvas.get_tk_widget().destroy()
-            self.chart_canvas = None
-            
-        if not self.expenses:
+        """Request the selected chart from the render thread, deferred until the Analysis tab is visible"""
+        if self.right_tabs.get() != self.ANALYSIS_TAB:
+            self.chart_dirty = True
+            return
+        self.chart_dirty = False
+        # Any read or render still in flight is for older data and will not be shown
+        self._chart_token += 1
+        token = self._chart_token
+
+        name = self.chart_selector.get()
+        if name == self.TREND_CHART:
+            self.chart_label.configure(text="Monthly Spending (3-month average)")
+            # Rollup reads run on the executor's readers, the chart follows once they are back
+            self.executor.read(
+                lambda db: ExpenseAnalytics(db).trend("month", periods=12, window=3),
+                on_done=lambda data: self.render_chart(token, name, "trend", data, any(data["totals"])),
+                on_error=self.on_chart_failed
+            )
+        elif name == self.BURN_DOWN_CHART:
+            self.chart_label.configure(text="Budget Burn-down This Month")
+            salary = self.salary
+            if salary <= 0:
+                self.render_chart(token, name, "burn_down", None, False)
+                return
+            self.executor.read(
+                lambda db: ExpenseAnalytics(db).burn_down(salary),
+                on_done=lambda data: self.render_chart(token, name, "burn_down", data, True),
+                on_error=self.on_chart_failed
+            )
+        else:
+            self.chart_label.configure(text="Expense Distribution")
+            # A copy: the running totals keep changing while the render runs
+            data = dict(self.aggregates.by_category)
+            self.render_chart(token, name, "category", data, bool(data))
+
+    def on_chart_failed(self, error):
+        self.update_status(f"⚠️ Chart could not be drawn: {str(error)}")
+
+    def render_chart(self, token, name, kind, data, has_data):
+        """Hand chart data to the render thread, or show the no-data message"""
+        if token != self._chart_token:
+            return
+        if not has_data:
+            self.chart_image = None
+            self.chart_image_label.pack_forget()
+            self.no_data_label.configure(text="Enter your salary to see the burn-down." if name == self.BURN_DOWN_CHART
+                                         else "No expense data to analyze.\nAdd some expenses first!")
             self.no_data_label.pack(expand=True)
             return
-            
+
+        future = self.chart_renderer.render(kind, data, self.dark_mode, self.chart_size())
+        self.show_chart_when_ready(future, token)
+
+    def chart_size(self):
+        """Pixel size for chart images, filling the chart area"""
+        width = self.chart_container.winfo_width() - 20
+        height = self.chart_container.winfo_height() - 20
+        if width < 100 or height < 100:
+            # Not laid out yet
+            return (500, 400)
+        return (width, height)
+
+    def on_chart_resized(self):
+        shown = self.chart_image
+        if shown is not None and (shown.width, shown.height) != self.chart_size():
+            self.update_chart()
+
+    def show_chart_when_ready(self, future, token):
+        """Show a rendered chart on the Tk thread once its render finishes (cached ones at once)"""
+        if token != self._chart_token:
+            return
+        if not future.done():
+            self.root.after(15, self.show_chart_when_ready, future, token)
+            return
+        try:
+            image = future.result()
+        except Exception as e:
+            self.update_status(f"⚠️ Chart could not be drawn: {str(e)}")
+            return
+
+        from PIL import ImageTk
+        self.chart_image = image
+        self.chart_photo = ImageTk.PhotoImage(image.to_pil())
+        self.chart_image_label.configure(image=self.chart_photo)
         self.no_data_label.pack_forget()
-        
-        fig = generate_category_chart(self.expenses, self.dark_mode)
-        if fig:
-            self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_container)
-            self.chart_canvas.draw()
-            self.chart_canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
-            plt.close(fig) # Prevent memory leaks
+        if not self.chart_image_label.winfo_manager():
+            self.chart_image_label.pack(expand=True, padx=10, pady=10)
+
+    def save_chart_image(self):
+        """Save the chart on screen as PNG, straight from its cached render"""
+        if self.chart_image is None:
+            messagebox.showinfo("ℹ️ No Chart", "There is no chart to save yet.")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=[("PNG images", "*.png")],
+            initialfile=f"{self.chart_selector.get().split(' ', 1)[-1].lower().replace(' ', '_')}.png",
+            title="Save chart"
+        )
+        if not file_path:
+            return
+        try:
+            self.chart_image.save(file_path)
+            self.update_status(f"✅ Chart saved to {os.path.basename(file_path)}")
+        except Exception as e:
+            messagebox.showerror("❌ Error", f"Unable to save chart: {str(e)}")
 
     def add_expense(self):
         """Validate and add a new expense"""
@@ -413,31 +887,46 @@ class ExpenseTrackerApp:
             return
             
         try:
-            amount = float(amount_str)
+            amount = to_paise(amount_str)
             if amount <= 0: raise ValueError
         except ValueError:
             messagebox.showwarning("⚠️ Input Error", "Please enter a valid amount greater than 0.")
             return
             
-        date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        date = to_epoch(datetime.datetime.now().replace(second=0, microsecond=0))
         comment = comment if comment else "N/A"
         
-        try:
-            self.db.add_expense(amount, category, comment, date_str)
-            self.load_data()
-            self.refresh_ui_data()
-            self.expense_entry.delete(0, "end")
-            self.comment_entry.delete(0, "end")
-            self.update_status(f"✅ Added ₹{amount:.2f} to {category}")
-        except Exception as e:
-            messagebox.showerror("❌ Database Error", str(e))
+        self.store.begin_write()
+        self.executor.write(
+            ExpenseStore.insert_row, amount, category, comment, date,
+            on_done=self.on_expense_added,
+            on_error=self.on_write_failed
+        )
+
+    def on_write_failed(self, error):
+        self.store.end_write()
+        self.show_db_error(error)
+
+    def on_expense_added(self, row):
+        self.store.end_write()
+        self.store.apply_insert([row])
+        self.expense_entry.delete(0, "end")
+        self.comment_entry.delete(0, "end")
+        self.update_status(f"✅ Added {format_money(row['expense'])} to {row['category']}")
 
     def export_to_csv(self):
-        """Export all expense data to a CSV file"""
-        if not self.expenses:
+        """Export expenses to a CSV file in the background"""
+        if self.export_cancel is not None:
+            messagebox.showinfo("ℹ️ Export Running", "An export is already in progress.")
+            return
+        if not self.store:
             messagebox.showinfo("ℹ️ No Data", "There are no expenses to export.")
             return
 
+        filters = self.ask_export_scope()
+        if filters is None:
+            return
+
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv")],
@@ -448,27 +937,143 @@ class ExpenseTrackerApp:
         if not file_path:
             return
 
-        try:
-            with open(file_path, mode="w", newline="", encoding="utf-8") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerow(["Amount (₹)", "Category", "Comment", "Date & Time"])
-                for expense in self.expenses:
-                    writer.writerow([
-                        f"{expense['expense']:.2f}",
-                        expense['category'],
-                        expense['comment'],
-                        expense['date']
-                    ])
-
-            messagebox.showinfo("✅ Export Complete", f"Expenses saved to {os.path.basename(file_path)}")
-            self.update_status(f"✅ Exported {len(self.expenses)} records to CSV")
-        except Exception as e:
-            messagebox.showerror("❌ Export Error", f"Unable to save CSV: {str(e)}")
-            self.update_status("⚠️ Export failed")
+        self.export_cancel = threading.Event()
+        self.cancel_export_btn.pack(side="right", padx=10)
+        self.set_status("⏳ Exporting to CSV...")
+        # The executor's own keywords are on_done/on_error, so the query filters are bound up front
+        self.executor.read(
+            functools.partial(export_csv, **filters), file_path,
+            lambda done, total: self.executor.post(self.on_export_progress, done, total),
+            self.export_cancel,
+            on_done=lambda count: self.on_export_done(file_path, count),
+            on_error=self.on_export_failed
+        )
+
+    def ask_export_scope(self):
+        """Ask what to export, returns query filters or None if cancelled"""
+        dialog = ctk.CTkToplevel(self.root)
+        dialog.title("Export to CSV")
+        dialog.geometry("360x300")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+
+        search_term = self.search_var.get().strip()
+        scope = ctk.StringVar(value="search" if search_term else "all")
+        result = {}
+
+        ctk.CTkLabel(dialog, text="⬇️ What should be exported?", font=FONT_H2).pack(anchor="w", padx=20, pady=(15, 10))
+        ctk.CTkRadioButton(dialog, text="All expenses", variable=scope, value="all").pack(anchor="w", padx=25, pady=3)
+        ctk.CTkRadioButton(
+            dialog,
+            text=f"Current search: \"{search_term}\"" if search_term else "Current search (no search active)",
+            variable=scope,
+            value="search",
+            state="normal" if search_term else "disabled"
+        ).pack(anchor="w", padx=25, pady=3)
+        ctk.CTkRadioButton(dialog, text="Date range (YYYY-MM-DD)", variable=scope, value="range").pack(anchor="w", padx=25, pady=3)
+
+        range_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        range_frame.pack(fill="x", padx=45, pady=5)
+        start_entry = ctk.CTkEntry(range_frame, placeholder_text="From", width=120)
+        start_entry.pack(side="left")
+        end_entry = ctk.CTkEntry(range_frame, placeholder_text="To", width=120)
+        end_entry.pack(side="left", padx=(10, 0))
+
+        def confirm():
+            if scope.get() == "search":
+                result["text"] = search_term
+            elif scope.get() == "range":
+                try:
+                    start = datetime.datetime.strptime(start_entry.get().strip(), "%Y-%m-%d")
+                    end = datetime.datetime.strptime(end_entry.get().strip(), "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("⚠️ Input Error", "Please enter dates as YYYY-MM-DD.", parent=dialog)
+                    return
+                # The end date is inclusive, the query bound is exclusive
+                result["start"] = to_epoch(start)
+                result["end"] = to_epoch(end + datetime.timedelta(days=1))
+            result["ok"] = True
+            dialog.destroy()
+
+        ctk.CTkButton(dialog, text="⬇️ Export", font=FONT_BODY_BOLD, command=confirm,
+                      fg_color=self.current_theme["secondary"], hover_color="#27ae60").pack(fill="x", padx=20, pady=(15, 5))
+        ctk.CTkButton(dialog, text="Cancel", font=FONT_BODY_BOLD, command=dialog.destroy,
+                      fg_color="transparent", border_width=1, text_color=self.current_theme["text"]).pack(fill="x", padx=20)
+
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        if not result.pop("ok", False):
+            return None
+        return result
+
+    def cancel_export(self):
+        if self.export_cancel is not None:
+            self.export_cancel.set()
+            self.set_status("⏳ Cancelling export...")
+
+    def on_export_progress(self, done, total):
+        if self.export_cancel is not None and not self.export_cancel.is_set():
+            percent = done * 100 // total if total else 100
+            self.set_status(f"⏳ Exporting to CSV... {done:,}/{total:,} ({percent}%)")
+
+    def finish_export(self):
+        self.export_cancel = None
+        self.cancel_export_btn.pack_forget()
+
+    def on_export_done(self, file_path, count):
+        self.finish_export()
+        messagebox.showinfo("✅ Export Complete", f"Expenses saved to {os.path.basename(file_path)}")
+        self.update_status(f"✅ Exported {count} records to CSV")
+
+    def on_export_failed(self, error):
+        self.finish_export()
+        if isinstance(error, ExportCancelled):
+            self.update_status("⚠️ Export cancelled")
+            return
+        messagebox.showerror("❌ Export Error", f"Unable to save CSV: {str(error)}")
+        self.update_status("⚠️ Export failed")
+
+    def import_from_file(self):
+        """Bulk import a bank statement CSV or JSON export in the background"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Statements", "*.csv *.json"), ("CSV files", "*.csv"), ("JSON files", "*.json")],
+            title="Import expenses"
+        )
+        if not file_path:
+            return
+
+        self.set_status("⏳ Importing expenses...")
+        self.store.begin_write()
+        self.executor.write(
+            functools.partial(import_expenses, ledger=self.ledger), file_path,
+            lambda done: self.executor.post(self.set_status, f"⏳ Importing expenses... {done:,} records read"),
+            on_done=self.on_import_done,
+            on_error=self.on_import_failed
+        )
+
+    def on_import_done(self, result):
+        # One reload for the whole import instead of a refresh per row
+        self.store.end_write()
+        self.load_data()
+        summary = (f"Imported {result['imported']:,} expenses.\n"
+                   f"Skipped {result['duplicates']:,} duplicates, {result['skipped']:,} non-debit "
+                   f"and {result['invalid']:,} invalid records.")
+        if result["errors"]:
+            summary += "\n\n" + "\n".join(result["errors"][:5])
+        messagebox.showinfo("✅ Import Complete", summary)
+        self.update_status(f"✅ Imported {result['imported']:,} expenses")
+
+    def on_import_failed(self, error):
+        # Batches committed before the failure are still worth showing
+        self.store.end_write()
+        self.load_data()
+        messagebox.showerror("❌ Import Error", f"Unable to import file: {str(error)}")
+        self.update_status("⚠️ Import failed")
 
     def delete_expense(self):
         """Delete selected expense from table and database"""
-        selection = self.tree.selection()
+        # Rows still loading have no id yet
+        selection = [expense_id for expense_id in self.history.selected_ids() if expense_id is not None]
         if not selection:
             messagebox.showwarning("⚠️ Selection Error", "Please select an expense to delete.")
             return
@@ -476,16 +1081,19 @@ class ExpenseTrackerApp:
         if not messagebox.askyesno("🗑️ Confirm Delete", "Are you sure you want to delete the selected expense(s)?"):
             return
             
-        try:
-            for item in selection:
-                expense_id = self.tree.item(item)['values'][4]
-                self.db.delete_expense(expense_id)
-            
-            self.load_data()
-            self.refresh_ui_data()
+        self.store.begin_write()
+        self.executor.write(ExpenseStore.delete_rows, selection,
+                            on_done=lambda rows: self.on_expenses_deleted(rows, len(selection)),
+                            on_error=self.on_write_failed)
+
+    def on_expenses_deleted(self, rows, selected):
+        self.store.end_write()
+        self.store.apply_delete(rows)
+        if len(rows) < selected:
+            # Only the hot database is written to
+            self.update_status(f"🗄️ Deleted {len(rows)} of {selected}: expenses in archived years are read-only")
+        else:
             self.update_status("✅ Deleted successfully")
-        except Exception as e:
-            messagebox.showerror("❌ Database Error", str(e))
             
     def clear_search(self):
         """Reset search entry and focus it"""
@@ -494,5 +1102,5 @@ class ExpenseTrackerApp:
 
 if __name__ == "__main__":
     root = ctk.CTk()
-    app = ExpenseTrackerApp(root)
+    app = ExpenseTrackerApp(root, startup_timing="--startup-timing" in sys.argv, perf_overlay="--perf" in sys.argv)
     root.mainloop()
@@ -0,0 +1,88 @@
+import time
+
+from database import LAST_OPTIMIZE_KEY, LAST_VACUUM_KEY
+
+
+class MaintenanceScheduler:
+    """Runs SQLite housekeeping on the writer thread while the user is idle.
+
+    Every ``check_ms`` it looks at how long ago the last key press or click
+    was; once that exceeds ``idle_seconds`` it queues one maintenance pass on
+    the DatabaseExecutor's writer, behind any pending writes:
+
+    - checkpoint the WAL (TRUNCATE) once it has grown past ``checkpoint_bytes``
+    - ``PRAGMA optimize`` at most every ``optimize_every`` seconds
+    - move closed years into read-only archives when a ShardedLedger is given
+      as ``ledger`` (see ledgers.py)
+    - ``VACUUM`` when at least ``vacuum_free_ratio`` of the file is free pages,
+      at most every ``vacuum_every`` seconds
+
+    Last run times are kept in app_meta, so the intervals hold across restarts.
+    """
+
+    def __init__(self, root, executor, check_ms=30_000, idle_seconds=60, checkpoint_bytes=4 * 2**20,
+                 optimize_every=3600, vacuum_every=7 * 86400, vacuum_free_ratio=0.25, ledger=None, on_done=None):
+        self.root = root
+        self.executor = executor
+        self.check_ms = check_ms
+        self.idle_seconds = idle_seconds
+        self.checkpoint_bytes = checkpoint_bytes
+        self.optimize_every = optimize_every
+        self.vacuum_every = vacuum_every
+        self.vacuum_free_ratio = vacuum_free_ratio
+        self.ledger = ledger
+        self.on_done = on_done
+        self._last_activity = time.monotonic()
+        self._running = False
+        self._pending = None
+        root.bind_all("<Any-KeyPress>", self.touch, add="+")
+        root.bind_all("<Any-ButtonPress>", self.touch, add="+")
+
+    def touch(self, event=None):
+        """Record user activity, postponing maintenance"""
+        self._last_activity = time.monotonic()
+
+    def start(self):
+        if self._pending is None:
+            self._pending = self.root.after(self.check_ms, self._tick)
+
+    def stop(self):
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+
+    def _tick(self):
+        self._pending = self.root.after(self.check_ms, self._tick)
+        if self._running or time.monotonic() - self._last_activity < self.idle_seconds:
+            return
+        self._running = True
+        self.executor.write(self.run, on_done=self._finished, on_error=self._failed)
+
+    def _finished(self, tasks):
+        self._running = False
+        if tasks and self.on_done:
+            self.on_done(tasks)
+
+    def _failed(self, error):
+        # Housekeeping is retried on the next idle pass; nothing for the user to act on
+        self._running = False
+
+    def run(self, db):
+        """One maintenance pass on ``db`` (the writer), returns the names of the tasks run"""
+        tasks = []
+        now = time.time()
+        # Archiving first, so a vacuum below can reclaim the pages it frees
+        if self.ledger is not None and self.ledger.archive_closed_years(db):
+            tasks.append("archive")
+        stats = db.storage_stats()
+        if stats["wal_bytes"] >= self.checkpoint_bytes:
+            db.checkpoint("TRUNCATE")
+            tasks.append("checkpoint")
+        if now - float(db.get_meta(LAST_OPTIMIZE_KEY, 0)) >= self.optimize_every:
+            db.optimize()
+            tasks.append("optimize")
+        free_ratio = stats["free_pages"] / stats["pages"] if stats["pages"] else 0
+        if free_ratio >= self.vacuum_free_ratio and now - float(db.get_meta(LAST_VACUUM_KEY, 0)) >= self.vacuum_every:
+            db.vacuum()
+            tasks.append("vacuum")
+        return tasks
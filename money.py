@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Amounts are stored and summed as integer paise; rupees only exist on screen and in files
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(value):
+    """Parse rupees (a number or numeric string) into integer paise, raising ValueError"""
+    try:
+        rupees = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount '{value}'")
+    if not rupees.is_finite():
+        raise ValueError(f"invalid amount '{value}'")
+    return int((rupees * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paise):
+    """Paise as a float number of rupees, for charts and other approximate displays"""
+    return paise / PAISE_PER_RUPEE
+
+
+def format_amount(paise):
+    """Paise as a plain "1234.50" string"""
+    sign = "-" if paise < 0 else ""
+    rupees, rest = divmod(abs(int(paise)), PAISE_PER_RUPEE)
+    return f"{sign}{rupees}.{rest:02d}"
+
+
+def format_money(paise):
+    """Paise as "₹1234.50" for display"""
+    return "₹" + format_amount(paise)
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+
+class PerfRecorder:
+    """Recent timings of named hot paths, kept in per-name ring buffers.
+
+    Disabled by default: ``timed`` and ``measure`` then cost one attribute
+    check per call. Once enabled, each call appends its duration to the
+    buffer for its name (the last ``capacity`` samples are kept) and
+    ``stats`` reports p50/p95 over them. Safe to record from the database
+    worker threads.
+    """
+
+    def __init__(self, capacity=256):
+        self.enabled = False
+        self.capacity = capacity
+        self._samples = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.capacity)
+                self._calls[name] = 0
+            samples.append(seconds)
+            self._calls[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def stats(self):
+        """{name: {"calls", "last_ms", "p50_ms", "p95_ms", "max_ms"}} over the buffered samples"""
+        with self._lock:
+            snapshot = {name: (list(samples), self._calls[name]) for name, samples in self._samples.items()}
+        stats = {}
+        for name, (samples, calls) in snapshot.items():
+            ordered = sorted(samples)
+            stats[name] = {
+                "calls": calls,
+                "last_ms": samples[-1] * 1000,
+                "p50_ms": self._percentile(ordered, 0.50) * 1000,
+                "p95_ms": self._percentile(ordered, 0.95) * 1000,
+                "max_ms": ordered[-1] * 1000
+            }
+        return stats
+
+    def summary(self, limit=3):
+        """One line with the ``limit`` slowest paths by p95, for the status bar overlay"""
+        stats = self.stats()
+        slowest = sorted(stats, key=lambda name: stats[name]["p95_ms"], reverse=True)[:limit]
+        return "  ·  ".join(
+            f"{name} {stats[name]['p50_ms']:.1f}/{stats[name]['p95_ms']:.1f} ms" for name in slowest
+        ) or "no samples yet"
+
+    def dump(self, file_path):
+        """Write the stats and the raw samples (ms) to a JSON file for offline analysis"""
+        with self._lock:
+            samples = {name: [s * 1000 for s in values] for name, values in self._samples.items()}
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"created": time.time(), "stats": self.stats(), "samples_ms": samples}, file, indent=2)
+
+
+# Shared by the app, the CLI and DatabaseManager
+perf = PerfRecorder()
+
+
+def timed(name):
+    """Decorator recording each call of the function under ``name`` while ``perf`` is enabled"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not perf.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                perf.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class measure:
+    """``with measure(name):`` records the block's duration while ``perf`` is enabled"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if perf.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            perf.record(self.name, time.perf_counter() - self.start)
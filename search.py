@@ -0,0 +1,172 @@
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class SearchIndex:
+    """Lowercase token index over expense categories and comments.
+
+    Matching keeps the History tab's substring semantics (the query may appear
+    anywhere in the category or the comment) but only verifies rows whose
+    tokens can contain the query. The index follows the store incrementally,
+    and a query that extends the previous one narrows the previous results.
+
+    When the store is in paged mode nothing is indexed in memory and searches
+    are answered by SQLite's full-text index instead.
+
+    With an ``executor`` (a DatabaseExecutor) the index is built on its reader
+    pool after each reset; until it is ready, searches go to SQLite as in
+    paged mode and store changes are queued. ``on_loaded(view)`` is passed
+    to those database-side views.
+    """
+
+    def __init__(self, store, executor=None, on_loaded=None):
+        self.store = store
+        self.executor = executor
+        self.on_loaded = on_loaded
+        self._text = {}
+        self._postings = {}
+        self._last_query = None
+        self._last_rows = None
+        # Store changes made while a background build runs, replayed once it lands
+        self._backlog = None
+        self._generation = 0
+        store.subscribe(self.on_store_changed)
+        self.rebuild()
+
+    @staticmethod
+    def _haystack(exp):
+        # NUL separator keeps a query from matching across the two fields
+        return f"{exp['category']}\x00{exp['comment']}".lower()
+
+    def rebuild(self):
+        self._text = {}
+        self._postings = {}
+        self._last_query = None
+        self._backlog = None
+        self._generation += 1
+        if self.store.paged:
+            return
+        if self.executor is None:
+            self._text, self._postings = self.build(self.store)
+            return
+        self._backlog = []
+        generation = self._generation
+        # A copy of the columns, the store may change while the build runs
+        self.executor.read(lambda db, rows: self.build(rows), self.store.snapshot_rows(),
+                           on_done=lambda index: self._built(generation, index))
+
+    @classmethod
+    def build(cls, rows):
+        """(text, postings) for ``rows``; touches nothing shared, so any thread can run it"""
+        text = {}
+        postings = {}
+        for exp in rows:
+            haystack = text[exp['id']] = cls._haystack(exp)
+            for token in set(TOKEN_RE.findall(haystack)):
+                postings.setdefault(token, set()).add(exp['id'])
+        return text, postings
+
+    def _built(self, generation, index):
+        if generation != self._generation:
+            return
+        self._text, self._postings = index
+        backlog, self._backlog = self._backlog, None
+        for event, rows in backlog:
+            self._apply(event, rows)
+
+    def on_store_changed(self, event, rows):
+        if event == "reset":
+            self.rebuild()
+            return
+        if event == "loaded":
+            return
+        self._last_query = None
+        if self.store.paged:
+            return
+        if self._backlog is not None:
+            self._backlog.append((event, rows))
+            return
+        self._apply(event, rows)
+
+    def _apply(self, event, rows):
+        for exp in rows:
+            if event == "insert":
+                self._add(exp)
+            elif event == "delete":
+                self._remove(exp['id'])
+
+    def _add(self, exp):
+        text = self._haystack(exp)
+        self._text[exp['id']] = text
+        for token in set(TOKEN_RE.findall(text)):
+            self._postings.setdefault(token, set()).add(exp['id'])
+
+    def _remove(self, expense_id):
+        text = self._text.pop(expense_id, None)
+        if text is None:
+            return
+        for token in set(TOKEN_RE.findall(text)):
+            ids = self._postings.get(token)
+            if ids is not None:
+                ids.discard(expense_id)
+                if not ids:
+                    del self._postings[token]
+
+    def _candidates(self, query):
+        """Ids that could match, or None when every row must be checked"""
+        words = TOKEN_RE.findall(query)
+        if not words:
+            return None
+        # Any occurrence of the query contains its longest word inside a single token
+        word = max(words, key=len)
+        ids = set()
+        for token, posting in self._postings.items():
+            if word in token:
+                ids |= posting
+        return ids
+
+    def search(self, query):
+        """Rows matching ``query`` in newest-first order (the store itself when empty)"""
+        query = query.lower()
+        if not query:
+            self._last_query = None
+            return self.store
+        if self.store.paged or self._backlog is not None:
+            return self.store.query(on_loaded=self.on_loaded, text=query)
+
+        if self._last_query is not None and query.startswith(self._last_query):
+            rows = [exp for exp in self._last_rows if query in self._text[exp['id']]]
+        else:
+            ids = self._candidates(query)
+            if ids is None:
+                ids = self._text.keys()
+            rows = [self.store.get(i) for i in ids if query in self._text[i]]
+            rows.sort(key=self.store.sort_key, reverse=True)
+
+        self._last_query = query
+        self._last_rows = rows
+        return rows
+
+
+class Debouncer:
+    """Collapse bursts of calls into one ``callback`` after ``delay`` ms of quiet"""
+
+    def __init__(self, widget, delay, callback):
+        self.widget = widget
+        self.delay = delay
+        self.callback = callback
+        self._pending = None
+
+    def trigger(self, *args):
+        self.cancel()
+        self._pending = self.widget.after(self.delay, self._fire)
+
+    def cancel(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _fire(self):
+        self._pending = None
+        self.callback()
@@ -0,0 +1,64 @@
+from tkinter import ttk
+
+from styles import FONT_BODY, FONT_SMALL_BOLD
+
+
+def style_treeview(theme):
+    """Configure the shared ttk Treeview style for a theme"""
+    style = ttk.Style()
+    if style.theme_use() != 'clam':
+        style.theme_use('clam')
+    style.configure('Treeview',
+                    background=theme["card"],
+                    foreground=theme["text"],
+                    fieldbackground=theme["card"],
+                    rowheight=30,
+                    font=FONT_BODY)
+    style.configure('Treeview.Heading', font=FONT_SMALL_BOLD, background=theme["primary"], foreground="white")
+    style.map('Treeview', background=[('selected', theme["primary"])])
+
+
+class ThemeManager:
+    """Registry of themed widgets, recolored in place when the theme changes.
+
+    Widgets are registered with the options that follow the theme, mapped to
+    keys of LIGHT_THEME/DARK_THEME (``register(label, text_color="text")``).
+    Switching themes configures just those options on the existing widgets,
+    so its cost depends on the number of themed widgets and not on how much
+    data they show. Anything that is not a plain option (ttk styles, charts)
+    hooks in with ``on_change(callback)``.
+    """
+
+    def __init__(self, theme):
+        self.theme = theme
+        self._widgets = []
+        self._callbacks = []
+
+    def __getitem__(self, key):
+        return self.theme[key]
+
+    def register(self, widget, **options):
+        """Track ``widget`` and give it the current colors, returns the widget"""
+        self._widgets.append((widget, options))
+        self._configure(widget, options)
+        return widget
+
+    def on_change(self, callback):
+        """Call ``callback(theme)`` after every theme switch"""
+        self._callbacks.append(callback)
+
+    def apply(self, theme):
+        """Recolor every registered widget for ``theme``"""
+        self.theme = theme
+        alive = []
+        for widget, options in self._widgets:
+            # Dialogs and other short-lived widgets drop out once destroyed
+            if widget.winfo_exists():
+                self._configure(widget, options)
+                alive.append((widget, options))
+        self._widgets = alive
+        for callback in self._callbacks:
+            callback(theme)
+
+    def _configure(self, widget, options):
+        widget.configure(**{option: self.theme[key] for option, key in options.items()})
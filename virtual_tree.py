@@ -0,0 +1,165 @@
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Treeview that only materializes the rows currently in view.
+
+    A fixed pool of Treeview items (the visible rows plus a small buffer) is
+    refilled from ``source`` as the user scrolls, so redraw cost depends on
+    the viewport height instead of the size of the ledger. ``source`` can be
+    any sequence supporting ``len()`` and integer indexing.
+    """
+
+    SHIFT_MASK = 0x0001
+    CONTROL_MASK = 0x0004
+
+    def __init__(self, parent, columns, row_values, row_id, buffer=2, **tree_options):
+        self.source = []
+        self.row_values = row_values
+        self.row_id = row_id
+        self.buffer = buffer
+        self.offset = 0
+        self.visible_rows = 1
+        self._items = []
+        self._shown = {}
+        self._item_ids = {}
+        self._selected = set()
+        self._replace_selection = False
+
+        self.tree = ttk.Treeview(parent, columns=columns, **tree_options)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3) or "break")
+        self.tree.bind("<Up>", lambda e: self._move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self._move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self._move_focus(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self._move_focus(self.visible_rows))
+        self.tree.bind("<Home>", lambda e: self._move_focus(-len(self.source)))
+        self.tree.bind("<End>", lambda e: self._move_focus(len(self.source)))
+
+    def pack(self, **options):
+        self.tree.pack(side="left", fill="both", expand=True, **options)
+        self.scrollbar.pack(side="right", fill="y")
+
+    def set_source(self, source):
+        """Show a new sequence of rows, scrolled to the top with no selection"""
+        self.source = source
+        self.offset = 0
+        self._selected = set()
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the visible window after the source changed in place"""
+        self._render()
+
+    def selected_ids(self):
+        return list(self._selected)
+
+    def forget(self, row_ids):
+        """Drop ids (e.g. deleted rows) from the selection"""
+        self._selected.difference_update(row_ids)
+
+    def scroll_to(self, offset):
+        self.offset = offset
+        self._render()
+
+    def see(self, index):
+        """Scroll just enough for ``index`` to be visible"""
+        if index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + self.visible_rows:
+            self.scroll_to(index - self.visible_rows + 1)
+
+    def _row_height(self):
+        style = self.tree.cget("style") or "Treeview"
+        try:
+            return int(ttk.Style().lookup(style, "rowheight") or 20)
+        except (TypeError, ValueError):
+            return 20
+
+    def _on_configure(self, event):
+        row_height = self._row_height()
+        heading = row_height
+        if self._items:
+            bbox = self.tree.bbox(self._items[0])
+            if bbox:
+                heading = bbox[1]
+        visible = max(1, (event.height - heading) // row_height)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self._render()
+
+    def _render(self):
+        total = len(self.source)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        wanted = max(0, min(self.visible_rows + self.buffer, total - self.offset))
+
+        while len(self._items) < wanted:
+            self._items.append(self.tree.insert("", "end"))
+        if len(self._items) > wanted:
+            stale = self._items[wanted:]
+            del self._items[wanted:]
+            self.tree.delete(*stale)
+            for iid in stale:
+                self._shown.pop(iid, None)
+
+        self._item_ids = {}
+        selection = []
+        for n, iid in enumerate(self._items):
+            row = self.source[self.offset + n]
+            values = self.row_values(row)
+            if self._shown.get(iid) != values:
+                self.tree.item(iid, values=values)
+                self._shown[iid] = values
+            row_id = self.row_id(row)
+            self._item_ids[iid] = row_id
+            if row_id in self._selected:
+                selection.append(iid)
+        self.tree.selection_set(selection)
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.source)))
+        elif action == "scroll":
+            step = self.visible_rows if args[1] == "pages" else 1
+            self.scroll_to(self.offset + int(args[0]) * step)
+
+    def _on_mousewheel(self, event):
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.offset - 3 * notches)
+        return "break"
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) in ("cell", "tree"):
+            self._replace_selection = not event.state & (self.SHIFT_MASK | self.CONTROL_MASK)
+
+    def _on_select(self, event):
+        chosen = {self._item_ids[iid] for iid in self.tree.selection() if iid in self._item_ids}
+        if self._replace_selection:
+            self._selected = chosen
+            self._replace_selection = False
+        else:
+            # Rows scrolled out of view keep their selection state
+            self._selected = (self._selected - set(self._item_ids.values())) | chosen
+
+    def _move_focus(self, delta):
+        if not self.source:
+            return "break"
+        focus = self.tree.focus()
+        current = self.offset + self._items.index(focus) if focus in self._items else self.offset - 1
+        index = max(0, min(len(self.source) - 1, current + delta))
+        self._selected = {self.row_id(self.source[index])}
+        self.see(index)
+        self._render()
+        self.tree.focus(self._items[index - self.offset])
+        return "break"